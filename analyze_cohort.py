@@ -0,0 +1,72 @@
+# Cohort analysis script: re-score saved test results in one Gemini batch job
+import datetime
+import glob
+import os
+import sys
+import orjson
+
+from config import RESULTS_DIR
+from lib.analyzer import analyze_results_batch
+
+def normalize_history(test_history):
+    """Give every history item a question_id; files saved before it was stored only embed the question"""
+    return [
+        item if 'question_id' in item else {**item, 'question_id': item['question']['id']}
+        for item in test_history
+    ]
+
+def load_result_files(paths):
+    """Read saved test result files (as written by app.py's save_test_results)
+
+    Files that can't be read or lack a usable test history are skipped with a
+    warning, so one bad file doesn't abort the whole cohort.
+    """
+    results = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                result = orjson.loads(f.read())
+            result['test_history'] = normalize_history(result['test_history'])
+        except (OSError, orjson.JSONDecodeError, KeyError, TypeError) as e:
+            print(f"Skipping {path}: {type(e).__name__}: {e}")
+            continue
+        results.append((path, result))
+    return results
+
+def analyze_cohort(paths):
+    """Analyze every result file together and save the placements to one file"""
+    results = load_result_files(paths)
+    if not results:
+        print("No test results to analyze")
+        return
+
+    # Saved histories embed each question, so the current bank isn't needed
+    questions = {
+        item['question_id']: item['question']
+        for _, result in results
+        for item in result['test_history']
+    }
+    analyses = analyze_results_batch([result['test_history'] for _, result in results], questions)
+
+    cohort = []
+    for (path, result), analysis in zip(results, analyses):
+        placement = analysis['placement']
+        print(f"{result['student_name']}: Level {placement['novakid_level']} ({placement['cefr_equivalent']}) "
+              f"[{analysis['_analysis_method']}]")
+        cohort.append({
+            "student_name": result['student_name'],
+            "result_file": os.path.basename(path),
+            "analysis": analysis
+        })
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Written next to the input files (the first one's directory if they're spread out)
+    output_file = os.path.join(os.path.dirname(results[0][0]), f"cohort_analysis_{timestamp}.json")
+    with open(output_file, 'wb') as f:
+        f.write(orjson.dumps(cohort, option=orjson.OPT_INDENT_2))
+    print(f"\nAnalyzed {len(cohort)} students")
+    print(f"Saved to {output_file}")
+
+if __name__ == "__main__":
+    # Result files can be given explicitly; default is every saved test result
+    analyze_cohort(sys.argv[1:] or sorted(glob.glob(os.path.join(RESULTS_DIR, 'test_result_*.json'))))
@@ -1,13 +1,16 @@
 import streamlit as st
-import json
 import os
+import copy
 import datetime
-from typing import Dict, Optional
+import time
+from html import escape
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
 
-from lib.adaptive_engine import AdaptiveEngine
+from lib.adaptive_engine import AdaptiveEngine, QuestionCatalog, load_catalog
 from lib.question_renderer import render_question, check_answer
-from lib.analyzer import analyze_results
-from config import QUESTIONS_FILE, RESULTS_DIR, QUESTIONS_PER_TEST
+from config import QUESTIONS_FILE, RESULTS_DIR, QUESTIONS_PER_TEST, CUSTOM_CSS_FILE, ANALYSIS_TIMEOUT_SECONDS
 
 st.set_page_config(
     page_title="Novakid Placement Test",
@@ -16,92 +19,166 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Custom CSS for bigger buttons for kids
-st.markdown("""
-<style>
-    .stButton > button {
-        height: 80px !important;
-        font-size: 1.5rem !important;
-        font-weight: bold !important;
-        border-radius: 15px !important;
-        border: 3px solid #e0e0e0 !important;
-        margin: 10px 0 !important;
-    }
-    
-    .stButton > button:hover {
-        border-color: #1f77b4 !important;
-        box-shadow: 0 4px 12px rgba(31, 119, 180, 0.3) !important;
-        transform: translateY(-2px) !important;
-        transition: all 0.3s ease !important;
-    }
-    
-    .stButton > button[kind="primary"] {
-        background-color: #1f77b4 !important;
-        border-color: #1f77b4 !important;
-        height: 90px !important;
-    }
-    
-    .stButton > button[kind="secondary"] {
-        height: 85px !important;
-        background-color: #f8f9fa !important;
-    }
-    
-    /* Make images more centered and responsive */
-    .stImage {
-        display: flex !important;
-        justify-content: center !important;
-    }
+# Session keys cleared when the student restarts the test
+_RESET_KEYS = (
+    'test_started', 'test_completed', 'adaptive_engine', 'current_question',
+    'question_number', 'test_history', 'student_name', 'student_age',
+    'test_results', 'analysis_future', 'analysis_deadline', 'answer_submitted', 'correct_count', 'total_count'
+)
+
+# Initial session state values
+_SESSION_DEFAULTS = {
+    'test_started': False,
+    'test_completed': False,
+    'adaptive_engine': None,
+    'current_question': None,
+    'question_number': 0,
+    'test_history': [],
+    'student_name': "",
+    'student_age': 'Not provided',
+    'test_results': None,
+    'analysis_future': None,
+    'analysis_deadline': None,
+    'answer_submitted': False,
+    'correct_count': 0,
+    'total_count': 0
+}
+
+# Sidebar labels for question types
+_MECHANIC_LABELS = {
+    'multiple-choice-text-text': '📝 Grammar',
+    'word-pronunciation-practice': '🗣️ Pronunciation',
+    'image-single-choice-from-texts': '🖼️ Vocabulary',
+    'audio-single-choice-from-images': '🎧 Listen & Choose',
+    'sentence-pronunciation-practice': '🗣️ Sentence Practice',
+    'sentence-scramble': '🧩 Word Order'
+}
+
+# CEFR equivalents indexed by Novakid level
+_CEFR = ("pre-A1", "A1", "A1+", "A2", "B1", "B2")
+
+# Results screen styling and copy
+_LEVEL_COLORS = {0: "#FF6B6B", 1: "#4ECDC4", 2: "#45B7D1", 3: "#96CEB4", 4: "#FECA57", 5: "#9B59B6"}
+_SKILL_ICONS = {"vocabulary": "📚", "pronunciation": "🗣️", "grammar": "✏️"}
+_LEVEL_DESCRIPTIONS = {
+    0: "You're just starting your English adventure! 🌱",
+    1: "You know some English words and can say simple things! 🌿",
+    2: "You can have basic conversations and understand simple stories! 🌳",
+    3: "You can talk about many topics and understand most conversations! 🌲",
+    4: "You're really good at English and can discuss complex topics! 🏔️",
+    5: "You're almost like a native speaker - amazing job! 🏆"
+}
+
+# Big celebration header at the top of the results screen
+_CELEBRATION_HEADER_HTML = (
+    "<div style='text-align: center; padding: 20px;'>"
+    "<h1 style='font-size: 4rem; margin: 0;'>🎉</h1>"
+    "<h1 style='color: #1f77b4; font-size: 3rem; margin: 0;'>Awesome Job!</h1>"
+    "<h2 style='color: #666; font-size: 1.5rem; margin: 10px 0;'>You completed the test! 🌟</h2>"
+    "</div>"
+)
+
+def get_question_catalog(path: str = QUESTIONS_FILE) -> QuestionCatalog:
+    """Question catalog shared across sessions, reloaded when the bank file changes
     
-    /* Center audio player */
-    .stAudio {
-        display: flex !important;
-        justify-content: center !important;
-    }
-</style>
-
-<script>
-// Listen for speech recognition results from iframe
-window.addEventListener('message', function(event) {
-    if (event.data.type === 'speech_result') {
-        // Store result in sessionStorage for Streamlit to check
-        sessionStorage.setItem('speech_result_' + event.data.questionId, JSON.stringify(event.data));
-        // Force page refresh to trigger Streamlit check
-        setTimeout(() => window.location.reload(), 1000);
-    }
-});
-</script>
-""", unsafe_allow_html=True)
+    load_catalog caches per (path, mtime), so a regenerated questions.json
+    is picked up by the next test without a server restart.
+    """
+    return load_catalog(path)
+
+def resolve_question(item: Dict) -> Dict:
+    """Get the full question for a test history entry
+    
+    Uses the session engine's catalog, so results resolve against the bank
+    the student was tested on even if questions.json has since changed.
+    """
+    question = st.session_state.adaptive_engine.catalog.get_question(item['question_id'])
+    return {**question, 'assigned_level': item['assigned_level']}
+
+def _model_text(value) -> str:
+    """Escape an LLM-provided string for the results HTML, folding blank lines too
+
+    A stray tag, '&' or blank line would otherwise break the whole merged
+    results block, not just one item.
+    """
+    return escape(" ".join(str(value).split()))
+
+def _now_stamp(fmt: str = "%Y%m%d_%H%M%S") -> str:
+    """Current local time formatted for names and result files"""
+    return datetime.datetime.now().strftime(fmt)
+
+@st.cache_resource(show_spinner=False)
+def load_custom_css(path: str = CUSTOM_CSS_FILE) -> str:
+    """Read the custom stylesheet once per server process"""
+    with open(path) as f:
+        return f.read()
+
+def inject_custom_styles():
+    """Emit the custom CSS block
+    
+    Streamlit drops elements that aren't re-emitted, so this must run on
+    every rerun rather than once per session.
+    """
+    # A style-only st.html block skips markdown parsing and takes no layout space
+    st.html(f"<style>\n{load_custom_css()}</style>")
+
+@st.cache_resource(show_spinner=False)
+def get_results_writer() -> ThreadPoolExecutor:
+    """Single background worker for result files, shared across sessions"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="results-writer")
+
+@st.cache_resource(show_spinner=False)
+def get_analysis_runner() -> ThreadPoolExecutor:
+    """Background workers for Gemini analyses, shared across sessions"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="analysis")
+
+def _write_result_file(filepath: str, payload: bytes):
+    """Write serialized results to disk (runs on the writer thread)"""
+    try:
+        with open(filepath, 'wb') as f:
+            f.write(payload)
+    except Exception as e:
+        print(f"Could not save results to {filepath}: {e}")
+
+def _save_analyzed_results(filepath: str, result_data: Dict, future):
+    """Add the finished analysis to a result record and write it (runs on the writer thread)"""
+    try:
+        result_data['analysis'] = future.result()
+        payload = orjson.dumps(result_data, option=orjson.OPT_INDENT_2, default=str)
+    except Exception as e:
+        print(f"Could not save results to {filepath}: {e}")
+        return
+    _write_result_file(filepath, payload)
+
+def current_accuracy() -> float:
+    """Running accuracy from the incrementally updated counters"""
+    total = st.session_state.total_count
+    return st.session_state.correct_count / total if total else 0
 
 def initialize_session_state():
     """Initialize all session state variables"""
-    if 'test_started' not in st.session_state:
-        st.session_state.test_started = False
-    if 'test_completed' not in st.session_state:
-        st.session_state.test_completed = False
-    if 'adaptive_engine' not in st.session_state:
-        st.session_state.adaptive_engine = None
-    if 'current_question' not in st.session_state:
-        st.session_state.current_question = None
-    if 'question_number' not in st.session_state:
-        st.session_state.question_number = 0
-    if 'test_history' not in st.session_state:
-        st.session_state.test_history = []
-    if 'student_name' not in st.session_state:
-        st.session_state.student_name = ""
-    if 'test_results' not in st.session_state:
-        st.session_state.test_results = None
-    if 'answer_submitted' not in st.session_state:
-        st.session_state.answer_submitted = False
+    for key, default in _SESSION_DEFAULTS.items():
+        if key not in st.session_state:
+            # Copy so mutable defaults aren't shared between sessions
+            st.session_state[key] = copy.copy(default)
+
+@st.cache_resource(show_spinner=False)
+def _prerequisites_ok() -> bool:
+    """Check required files once per server process"""
+    if not os.path.exists(QUESTIONS_FILE):
+        return False
+    
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    return True
 
 def check_prerequisites():
     """Check if required files exist"""
-    if not os.path.exists(QUESTIONS_FILE):
+    if not _prerequisites_ok():
+        # Don't remember the failure, so generating the bank fixes it without a restart
+        _prerequisites_ok.clear()
         st.error("❌ Question bank not found!")
         st.info("Please run: `python generate_questions.py` to generate the question bank first.")
         st.stop()
-    
-    if not os.path.exists(RESULTS_DIR):
-        os.makedirs(RESULTS_DIR, exist_ok=True)
 
 def show_welcome_screen():
     """Display welcome screen and collect student info"""
@@ -132,7 +209,7 @@ def show_welcome_screen():
         start_button = st.form_submit_button("🚀 Start Test", type="primary", use_container_width=True)
         
         if start_button:
-            st.session_state.student_name = name or f"Student_{datetime.datetime.now().strftime('%H%M')}"
+            st.session_state.student_name = name or f"Student_{_now_stamp('%H%M')}"
             st.session_state.student_age = age
             start_test()
             st.rerun()
@@ -140,10 +217,12 @@ def show_welcome_screen():
 def start_test():
     """Initialize the adaptive test"""
     try:
-        st.session_state.adaptive_engine = AdaptiveEngine(QUESTIONS_FILE)
+        st.session_state.adaptive_engine = AdaptiveEngine.from_catalog(get_question_catalog())
         st.session_state.test_started = True
         st.session_state.question_number = 0
         st.session_state.test_history = []
+        st.session_state.correct_count = 0
+        st.session_state.total_count = 0
         st.session_state.current_question = st.session_state.adaptive_engine.get_next_question()
         st.session_state.answer_submitted = False
         
@@ -156,160 +235,206 @@ def start_test():
 
 def process_answer(answer):
     """Process student answer and move to next question"""
-    if st.session_state.current_question is None:
+    ss = st.session_state
+    if ss.current_question is None:
         return
     
     # Check if answer is correct
-    is_correct = check_answer(st.session_state.current_question, answer)
+    is_correct = check_answer(ss.current_question, answer)
     
-    # Add to test history
-    st.session_state.test_history.append({
-        'question': st.session_state.current_question,
+    # Add to test history (question ID only, full question lives in the catalog)
+    ss.test_history.append({
+        'question_id': ss.current_question['id'],
+        'assigned_level': ss.current_question.get('assigned_level', 1),
         'answer': answer,
         'correct': is_correct,
         'response_time': 0  # Not tracking time in MVP
     })
     
+    # Update running score so screens don't rescan the history
+    ss.total_count += 1
+    ss.correct_count += int(is_correct)
+    
     # Update adaptive engine
-    st.session_state.adaptive_engine.update_performance(
-        st.session_state.current_question['id'], 
+    ss.adaptive_engine.update_performance(
+        ss.current_question['id'], 
         is_correct
     )
     
-    # Brief feedback
-    if is_correct:
-        st.success("✅ Correct!")
-    else:
-        st.error("❌ Incorrect")
+    # Brief feedback, shown as a toast on the next rerun so we can advance immediately
+    ss.last_feedback = "✅ Correct!" if is_correct else "❌ Incorrect"
     
     # Check if test should continue
-    if len(st.session_state.test_history) >= QUESTIONS_PER_TEST:
+    if len(ss.test_history) >= QUESTIONS_PER_TEST:
         complete_test()
-        import time
-        time.sleep(1)
         st.rerun()
         return
     
     # Get next question
-    next_question = st.session_state.adaptive_engine.get_next_question()
+    next_question = ss.adaptive_engine.get_next_question()
     if next_question:
-        st.session_state.current_question = next_question
-        st.session_state.question_number += 1
-        st.session_state.answer_submitted = False
+        ss.current_question = next_question
+        ss.question_number += 1
+        ss.answer_submitted = False
     else:
         complete_test()
-        import time
-        time.sleep(1)
         st.rerun()
         return
     
-    # Brief pause then auto-advance
-    import time
-    time.sleep(1)
+    # Auto-advance
     st.rerun()
 
 def complete_test():
-    """Complete the test and show results"""
-    st.session_state.test_completed = True
+    """Complete the test and start the analysis in the background
+    
+    The results screen renders right away and waits for the analysis
+    (see wait_for_analysis) instead of the last answer blocking on Gemini.
+    """
+    ss = st.session_state
+    ss.test_completed = True
     
-    # Analyze results
     try:
-        questions_dict = {}
-        with open(QUESTIONS_FILE) as f:
-            questions_dict = json.load(f)
+        # Imported lazily: pulls in the Gemini client, only needed once per test
+        from lib.analyzer import analyze_results
         
-        st.session_state.test_results = analyze_results(
-            st.session_state.test_history,
-            questions_dict
+        filepath, result_data = _result_record()
+        ss.analysis_future = get_analysis_runner().submit(
+            analyze_results,
+            ss.test_history,
+            ss.adaptive_engine.catalog.questions_by_id
+        )
+        # Saved from the worker side, so closing the tab while "Analyzing..." keeps the result file
+        writer = get_results_writer()
+        ss.analysis_future.add_done_callback(
+            lambda future: writer.submit(_save_analyzed_results, filepath, result_data, future)
         )
+        ss.analysis_deadline = time.monotonic() + ANALYSIS_TIMEOUT_SECONDS
     except Exception as e:
-        st.error(f"Error analyzing results: {e}")
-        print(f"Analysis error details: {e}")
-        # Fallback to basic results
-        correct_count = sum(1 for h in st.session_state.test_history if h['correct'])
-        accuracy = correct_count / len(st.session_state.test_history)
-        estimated_level = min(5, max(0, int(accuracy * 5)))
-        
-        st.session_state.test_results = {
-            "placement": {
-                "novakid_level": estimated_level,
-                "confidence": accuracy,
-                "cefr_equivalent": ["pre-A1", "A1", "A1+", "A2", "B1", "B2"][estimated_level],
-                "level_justification": f"Based on {accuracy:.1%} accuracy"
-            }
+        _use_basic_results(e)
+        save_test_results()
+
+def _analysis_ready() -> bool:
+    """True once the background analysis has finished or ran out of time"""
+    ss = st.session_state
+    return ss.analysis_future.done() or time.monotonic() >= ss.analysis_deadline
+
+def finish_analysis():
+    """Store the finished background analysis for the results screen
+    
+    Past the deadline the student gets the rule-based placement, so a hung
+    Gemini call can't leave them waiting forever. The result file is written
+    by the worker either way (see complete_test).
+    """
+    ss = st.session_state
+    future = ss.analysis_future
+    ss.analysis_future = None
+    
+    if not future.done():
+        # Already running, so it can't be cancelled; Gemini's HTTP timeout frees the worker
+        _use_basic_results(TimeoutError(f"No analysis after {ANALYSIS_TIMEOUT_SECONDS}s"))
+    else:
+        try:
+            ss.test_results = future.result()
+        except Exception as e:
+            _use_basic_results(e)
+
+def _use_basic_results(error: Exception):
+    """Fallback to basic results from the running accuracy"""
+    st.error(f"Error analyzing results: {error}")
+    print(f"Analysis error details: {error}")
+    accuracy = current_accuracy()
+    estimated_level = min(5, max(0, int(accuracy * 5)))
+    
+    st.session_state.test_results = {
+        "placement": {
+            "novakid_level": estimated_level,
+            "confidence": accuracy,
+            "cefr_equivalent": _CEFR[estimated_level],
+            "level_justification": f"Based on {accuracy:.1%} accuracy"
         }
-    
-    # Save results
-    save_test_results()
+    }
 
-def save_test_results():
-    """Save test results to file"""
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"test_result_{st.session_state.student_name}_{timestamp}.json"
+def _result_record() -> Tuple[str, Dict]:
+    """Result file path and contents for the finished test; the caller fills in 'analysis'"""
+    ss = st.session_state
+    timestamp = _now_stamp()
+    filename = f"test_result_{ss.student_name}_{timestamp}.json"
     filepath = os.path.join(RESULTS_DIR, filename)
     
     result_data = {
-        "student_name": st.session_state.student_name,
-        "student_age": getattr(st.session_state, 'student_age', 'Not provided'),
+        "student_name": ss.student_name,
+        "student_age": ss.student_age,
         "timestamp": timestamp,
-        "test_history": st.session_state.test_history,
-        "analysis": st.session_state.test_results,
-        "final_level": st.session_state.adaptive_engine.current_level if st.session_state.adaptive_engine else 1
+        "test_history": [
+            {**item, 'question': resolve_question(item)} for item in ss.test_history
+        ],
+        "analysis": None,
+        "final_level": ss.adaptive_engine.current_level
     }
+    return filepath, result_data
+
+def save_test_results():
+    """Save test results with the analysis on screen to file in the background"""
+    filepath, result_data = _result_record()
+    result_data['analysis'] = st.session_state.test_results
     
     try:
-        with open(filepath, 'w') as f:
-            json.dump(result_data, f, indent=2, default=str)
-        st.success(f"Results saved: {filename}")
+        # Serialize here so the writer never touches live session state
+        payload = orjson.dumps(result_data, option=orjson.OPT_INDENT_2, default=str)
     except Exception as e:
         st.warning(f"Could not save results: {e}")
+        return
+    
+    # Disk I/O happens off the script thread so the results screen isn't held up
+    get_results_writer().submit(_write_result_file, filepath, payload)
 
 def show_test_interface():
     """Show the main test interface"""
     # All progress and scoring info goes to sidebar
     with st.sidebar:
-        st.title("🎓 Test Progress")
-        
-        # Progress
-        progress = st.session_state.question_number / QUESTIONS_PER_TEST
-        st.metric("Questions", f"{st.session_state.question_number}/{QUESTIONS_PER_TEST}")
-        st.progress(progress)
-        
-        # Current level
-        current_level = st.session_state.adaptive_engine.current_level
-        st.metric("Current Level", f"Level {current_level}")
-        
-        # Question type
-        if st.session_state.current_question:
-            mechanic = st.session_state.current_question['mechanic']
-            mechanic_labels = {
-                'multiple-choice-text-text': '📝 Grammar',
-                'word-pronunciation-practice': '🗣️ Pronunciation', 
-                'image-single-choice-from-texts': '🖼️ Vocabulary',
-                'audio-single-choice-from-images': '🎧 Listen & Choose',
-                'sentence-pronunciation-practice': '🗣️ Sentence Practice',
-                'sentence-scramble': '🧩 Word Order'
-            }
-            st.info(mechanic_labels.get(mechanic, mechanic))
-        
-        # Running score
-        if st.session_state.test_history:
-            correct_count = sum(1 for h in st.session_state.test_history if h['correct'])
-            accuracy = correct_count / len(st.session_state.test_history)
-            st.metric("Accuracy", f"{accuracy:.0%}")
+        show_progress_sidebar()
     
     # Clean main area - only question and answers
-    if st.session_state.current_question and not st.session_state.answer_submitted:
+    show_question_area()
+
+def show_progress_sidebar():
+    """Show test progress; only changes when an answer is processed (full rerun)"""
+    ss = st.session_state
+    st.title("🎓 Test Progress")
+    
+    # Progress
+    progress = ss.question_number / QUESTIONS_PER_TEST
+    st.metric("Questions", f"{ss.question_number}/{QUESTIONS_PER_TEST}")
+    st.progress(progress)
+    
+    # Current level
+    current_level = ss.adaptive_engine.current_level
+    st.metric("Current Level", f"Level {current_level}")
+    
+    # Question type
+    if ss.current_question:
+        mechanic = ss.current_question['mechanic']
+        st.info(_MECHANIC_LABELS.get(mechanic, mechanic))
+    
+    # Running score
+    if ss.total_count:
+        st.metric("Accuracy", f"{current_accuracy():.0%}")
+
+@st.fragment
+def show_question_area():
+    """Render the current question; clicks within a question rerun only this fragment"""
+    ss = st.session_state
+    if ss.current_question and not ss.answer_submitted:
         # Render the question
-        answer = render_question(st.session_state.current_question, st.session_state.question_number)
+        answer = render_question(ss.current_question, ss.question_number)
         
-        # Process answer if provided
+        # Process answer if provided (process_answer triggers a full app rerun)
         if answer is not None:
-            st.session_state.answer_submitted = True
+            ss.answer_submitted = True
             process_answer(answer)
     
-    elif st.session_state.answer_submitted:
-        # Just show feedback briefly, auto-advance handled in process_answer
+    elif ss.answer_submitted:
+        # Feedback is shown as a toast, auto-advance handled in process_answer
         pass
     
     else:
@@ -317,233 +442,264 @@ def show_test_interface():
         complete_test()
         st.rerun()
 
+@st.fragment(run_every=1)
+def wait_for_analysis():
+    """Poll the background analysis; rerun the whole app once it's ready or timed out"""
+    if _analysis_ready():
+        st.rerun()
+    st.info("🔎 Working out your English level...")
+
 def show_results_screen():
     """Display final test results with kid-friendly design"""
-    # Big celebration header
-    st.markdown("""
-    <div style='text-align: center; padding: 20px;'>
-        <h1 style='font-size: 4rem; margin: 0;'>🎉</h1>
-        <h1 style='color: #1f77b4; font-size: 3rem; margin: 0;'>Awesome Job!</h1>
-        <h2 style='color: #666; font-size: 1.5rem; margin: 10px 0;'>You completed the test! 🌟</h2>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    if st.session_state.test_results and 'placement' in st.session_state.test_results:
-        placement = st.session_state.test_results['placement']
+    ss = st.session_state
+    if ss.analysis_future is not None and _analysis_ready():
+        finish_analysis()
+    
+    if ss.analysis_future is not None:
+        # Show the header straight away while Gemini is still working
+        st.markdown(_CELEBRATION_HEADER_HTML, unsafe_allow_html=True)
+        wait_for_analysis()
+        return
+    
+    # All static result markup is collected and sent as a single markdown element
+    html_parts = [_CELEBRATION_HEADER_HTML]
+    
+    if ss.test_results and 'placement' in ss.test_results:
+        placement = ss.test_results['placement']
         
         # Giant level badge
-        level_colors = {0: "#FF6B6B", 1: "#4ECDC4", 2: "#45B7D1", 3: "#96CEB4", 4: "#FECA57", 5: "#9B59B6"}
-        level_color = level_colors.get(placement['novakid_level'], "#1f77b4")
+        level_color = _LEVEL_COLORS.get(placement['novakid_level'], "#1f77b4")
         
-        st.markdown(f"""
-        <div style='text-align: center; padding: 30px; background: linear-gradient(135deg, {level_color}22 0%, {level_color}44 100%); 
-                    border-radius: 20px; margin: 20px 0; border: 3px solid {level_color};'>
-            <h1 style='font-size: 4rem; color: {level_color}; margin: 0;'>Level {placement['novakid_level']}</h1>
-            <h3 style='color: #333; margin: 10px 0;'>Your English Level</h3>
-            <p style='font-size: 1.2rem; color: #666; margin: 5px 0;'>CEFR: {placement['cefr_equivalent']}</p>
-        </div>
-        """, unsafe_allow_html=True)
+        html_parts.append(
+            f"<div style='text-align: center; padding: 30px; background: linear-gradient(135deg, {level_color}22 0%, {level_color}44 100%); "
+            f"border-radius: 20px; margin: 20px 0; border: 3px solid {level_color};'>"
+            f"<h1 style='font-size: 4rem; color: {level_color}; margin: 0;'>Level {placement['novakid_level']}</h1>"
+            "<h3 style='color: #333; margin: 10px 0;'>Your English Level</h3>"
+            f"<p style='font-size: 1.2rem; color: #666; margin: 5px 0;'>CEFR: {_model_text(placement['cefr_equivalent'])}</p>"
+            "</div>"
+        )
         
         # Fun skill badges
-        if 'skill_analysis' in st.session_state.test_results:
-            st.markdown("<h2 style='text-align: center; color: #1f77b4;'>🏆 Your Super Skills!</h2>", unsafe_allow_html=True)
+        if 'skill_analysis' in ss.test_results:
+            html_parts.append("<h2 style='text-align: center; color: #1f77b4;'>🏆 Your Super Skills!</h2>")
             
-            skill_analysis = st.session_state.test_results['skill_analysis']
-            skill_icons = {"vocabulary": "📚", "pronunciation": "🗣️", "grammar": "✏️"}
+            skill_analysis = ss.test_results['skill_analysis']
+            skill_cards = []
+            for skill, data in skill_analysis.items():
+                score = data['score']
+                icon = _SKILL_ICONS.get(skill, "⭐")
+                
+                # Star rating based on score
+                stars = "⭐" * max(1, min(5, int(score * 5)))
+                
+                # Color coding
+                if score >= 0.9:
+                    badge_color = "#4CAF50"  # Green
+                    badge_text = "Amazing!"
+                elif score >= 0.7:
+                    badge_color = "#FF9800"  # Orange
+                    badge_text = "Great!"
+                else:
+                    badge_color = "#2196F3"  # Blue
+                    badge_text = "Good!"
+                
+                skill_cards.append(
+                    f"<div style='flex: 1; text-align: center; padding: 20px; background: {badge_color}22; "
+                    f"border-radius: 15px; margin: 10px; border: 2px solid {badge_color};'>"
+                    f"<div style='font-size: 3rem; margin: 0;'>{icon}</div>"
+                    f"<h3 style='color: {badge_color}; margin: 10px 0;'>{_model_text(skill.title())}</h3>"
+                    f"<div style='font-size: 1.5rem; margin: 5px 0;'>{stars}</div>"
+                    f"<p style='color: {badge_color}; font-weight: bold; margin: 5px 0;'>{badge_text}</p>"
+                    "</div>"
+                )
             
-            cols = st.columns(len(skill_analysis))
-            for i, (skill, data) in enumerate(skill_analysis.items()):
-                with cols[i]:
-                    score = data['score']
-                    icon = skill_icons.get(skill, "⭐")
-                    
-                    # Star rating based on score
-                    stars = "⭐" * max(1, min(5, int(score * 5)))
-                    
-                    # Color coding
-                    if score >= 0.9:
-                        badge_color = "#4CAF50"  # Green
-                        badge_text = "Amazing!"
-                    elif score >= 0.7:
-                        badge_color = "#FF9800"  # Orange
-                        badge_text = "Great!"
-                    else:
-                        badge_color = "#2196F3"  # Blue
-                        badge_text = "Good!"
-                    
-                    st.markdown(f"""
-                    <div style='text-align: center; padding: 20px; background: {badge_color}22; 
-                                border-radius: 15px; margin: 10px; border: 2px solid {badge_color};'>
-                        <div style='font-size: 3rem; margin: 0;'>{icon}</div>
-                        <h3 style='color: {badge_color}; margin: 10px 0;'>{skill.title()}</h3>
-                        <div style='font-size: 1.5rem; margin: 5px 0;'>{stars}</div>
-                        <p style='color: {badge_color}; font-weight: bold; margin: 5px 0;'>{badge_text}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+            # Cards laid out in one flex row instead of st.columns
+            html_parts.append(f"<div style='display: flex; flex-wrap: wrap;'>{''.join(skill_cards)}</div>")
         
         # What this means section
-        st.markdown("---")
-        st.markdown("<h2 style='text-align: center; color: #1f77b4;'>🎯 What This Means</h2>", unsafe_allow_html=True)
+        html_parts.append("<hr>")
+        html_parts.append("<h2 style='text-align: center; color: #1f77b4;'>🎯 What This Means</h2>")
         
         # Kid-friendly explanation
-        level_descriptions = {
-            0: "You're just starting your English adventure! 🌱",
-            1: "You know some English words and can say simple things! 🌿", 
-            2: "You can have basic conversations and understand simple stories! 🌳",
-            3: "You can talk about many topics and understand most conversations! 🌲",
-            4: "You're really good at English and can discuss complex topics! 🏔️",
-            5: "You're almost like a native speaker - amazing job! 🏆"
-        }
-        
-        description = level_descriptions.get(placement['novakid_level'], "You're doing great!")
-        st.markdown(f"""
-        <div style='text-align: center; padding: 25px; background: #f0f8ff; 
-                    border-radius: 15px; border-left: 5px solid #1f77b4;'>
-            <p style='font-size: 1.3rem; color: #333; margin: 0;'>{description}</p>
-        </div>
-        """, unsafe_allow_html=True)
+        description = _LEVEL_DESCRIPTIONS.get(placement['novakid_level'], "You're doing great!")
+        html_parts.append(
+            "<div style='text-align: center; padding: 25px; background: #f0f8ff; "
+            "border-radius: 15px; border-left: 5px solid #1f77b4;'>"
+            f"<p style='font-size: 1.3rem; color: #333; margin: 0;'>{description}</p>"
+            "</div>"
+        )
         
         # Next steps - kid friendly
-        if 'recommendations' in st.session_state.test_results:
-            st.markdown("---")
-            st.markdown("<h2 style='text-align: center; color: #1f77b4;'>🚀 What's Next?</h2>", unsafe_allow_html=True)
+        if 'recommendations' in ss.test_results:
+            html_parts.append("<hr>")
+            html_parts.append("<h2 style='text-align: center; color: #1f77b4;'>🚀 What's Next?</h2>")
             
-            recs = st.session_state.test_results['recommendations']
+            recs = ss.test_results['recommendations']
             
             # Starting point as a big friendly card
             starting_point = recs.get('suggested_starting_point', 'Keep practicing!')
-            st.markdown(f"""
-            <div style='text-align: center; padding: 25px; background: #e8f5e8; 
-                        border-radius: 15px; border: 2px solid #4CAF50; margin: 20px 0;'>
-                <h3 style='color: #4CAF50; margin: 0 0 10px 0;'>🎯 Your Starting Point</h3>
-                <p style='font-size: 1.2rem; color: #333; margin: 0;'>{starting_point}</p>
-            </div>
-            """, unsafe_allow_html=True)
+            html_parts.append(
+                "<div style='text-align: center; padding: 25px; background: #e8f5e8; "
+                "border-radius: 15px; border: 2px solid #4CAF50; margin: 20px 0;'>"
+                "<h3 style='color: #4CAF50; margin: 0 0 10px 0;'>🎯 Your Starting Point</h3>"
+                f"<p style='font-size: 1.2rem; color: #333; margin: 0;'>{_model_text(starting_point)}</p>"
+                "</div>"
+            )
             
-            # Strengths and focus areas in kid-friendly format
-            col1, col2 = st.columns(2)
+            # Strengths and focus areas in kid-friendly format, side by side
+            strengths_html = ""
+            if recs.get('strengths_to_build_on'):
+                strengths_html = (
+                    "<div style='padding: 20px; background: #fff3cd; border-radius: 15px; border: 2px solid #ffc107;'>"
+                    "<h3 style='color: #e67e22; text-align: center;'>💪 Your Superpowers</h3>"
+                    "</div>"
+                )
+                for strength in recs['strengths_to_build_on'][:2]:  # Limit to 2 for kids
+                    strengths_html += f"<p style='margin: 10px 0; color: #666;'>⭐ {_model_text(strength)}</p>"
             
-            with col1:
-                if recs.get('strengths_to_build_on'):
-                    st.markdown("""
-                    <div style='padding: 20px; background: #fff3cd; border-radius: 15px; border: 2px solid #ffc107;'>
-                        <h3 style='color: #e67e22; text-align: center;'>💪 Your Superpowers</h3>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    for strength in recs['strengths_to_build_on'][:2]:  # Limit to 2 for kids
-                        st.markdown(f"<p style='margin: 10px 0; color: #666;'>⭐ {strength}</p>", unsafe_allow_html=True)
+            focus_html = ""
+            if recs.get('immediate_focus'):
+                focus_html = (
+                    "<div style='padding: 20px; background: #e1f5fe; border-radius: 15px; border: 2px solid #03a9f4;'>"
+                    "<h3 style='color: #0277bd; text-align: center;'>🎯 Practice These</h3>"
+                    "</div>"
+                )
+                for focus in recs['immediate_focus'][:2]:  # Limit to 2 for kids
+                    focus_html += f"<p style='margin: 10px 0; color: #666;'>📚 {_model_text(focus)}</p>"
             
-            with col2:
-                if recs.get('immediate_focus'):
-                    st.markdown("""
-                    <div style='padding: 20px; background: #e1f5fe; border-radius: 15px; border: 2px solid #03a9f4;'>
-                        <h3 style='color: #0277bd; text-align: center;'>🎯 Practice These</h3>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    for focus in recs['immediate_focus'][:2]:  # Limit to 2 for kids
-                        st.markdown(f"<p style='margin: 10px 0; color: #666;'>📚 {focus}</p>", unsafe_allow_html=True)
+            html_parts.append(
+                "<div style='display: flex; gap: 1rem;'>"
+                f"<div style='flex: 1;'>{strengths_html}</div>"
+                f"<div style='flex: 1;'>{focus_html}</div>"
+                "</div>"
+            )
     
     else:
         # Fallback when analysis fails - show basic results
+        st.markdown(html_parts.pop(), unsafe_allow_html=True)
         st.warning("⚠️ Analysis still processing, showing basic results...")
         
-        correct_count = sum(1 for h in st.session_state.test_history if h['correct'])
-        total_questions = len(st.session_state.test_history)
-        accuracy = correct_count / total_questions if total_questions else 0
+        accuracy = current_accuracy()
         estimated_level = min(5, max(0, int(accuracy * 5)))
         
         # Basic level display
-        level_colors = {0: "#FF6B6B", 1: "#4ECDC4", 2: "#45B7D1", 3: "#96CEB4", 4: "#FECA57", 5: "#9B59B6"}
-        level_color = level_colors.get(estimated_level, "#1f77b4")
+        level_color = _LEVEL_COLORS.get(estimated_level, "#1f77b4")
         
-        st.markdown(f"""
-        <div style='text-align: center; padding: 30px; background: linear-gradient(135deg, {level_color}22 0%, {level_color}44 100%); 
-                    border-radius: 20px; margin: 20px 0; border: 3px solid {level_color};'>
-            <h1 style='font-size: 4rem; color: {level_color}; margin: 0;'>Level {estimated_level}</h1>
-            <h3 style='color: #333; margin: 10px 0;'>Your English Level</h3>
-            <p style='font-size: 1.2rem; color: #666; margin: 5px 0;'>Based on {accuracy:.0%} accuracy</p>
-        </div>
-        """, unsafe_allow_html=True)
+        html_parts.append(
+            f"<div style='text-align: center; padding: 30px; background: linear-gradient(135deg, {level_color}22 0%, {level_color}44 100%); "
+            f"border-radius: 20px; margin: 20px 0; border: 3px solid {level_color};'>"
+            f"<h1 style='font-size: 4rem; color: {level_color}; margin: 0;'>Level {estimated_level}</h1>"
+            "<h3 style='color: #333; margin: 10px 0;'>Your English Level</h3>"
+            f"<p style='font-size: 1.2rem; color: #666; margin: 5px 0;'>Based on {accuracy:.0%} accuracy</p>"
+            "</div>"
+        )
     
     # Fun test stats for kids
-    st.markdown("---")
-    st.markdown("<h2 style='text-align: center; color: #1f77b4;'>📊 Your Test Numbers</h2>", unsafe_allow_html=True)
-    
-    correct_count = sum(1 for h in st.session_state.test_history if h['correct'])
-    total_questions = len(st.session_state.test_history)
-    accuracy = correct_count / total_questions if total_questions else 0
+    html_parts.append("<hr>")
+    html_parts.append("<h2 style='text-align: center; color: #1f77b4;'>📊 Your Test Numbers</h2>")
+    
+    correct_count = ss.correct_count
+    total_questions = ss.total_count
+    accuracy = current_accuracy()
+    
+    # Visual progress bar for correct answers, centered at half width
+    html_parts.append(
+        "<div style='max-width: 50%; margin: 10px auto; text-align: center; padding: 20px; background: #f8f9fa; border-radius: 15px;'>"
+        f"<h3 style='color: #333; margin: 0 0 15px 0;'>You got {correct_count} out of {total_questions} questions right!</h3>"
+        "<div style='background: #e0e0e0; height: 20px; border-radius: 10px; overflow: hidden; margin: 10px 0;'>"
+        f"<div style='background: #4CAF50; height: 100%; width: {accuracy*100}%; transition: width 0.5s;'></div>"
+        "</div>"
+        f"<p style='font-size: 1.2rem; color: #4CAF50; margin: 10px 0; font-weight: bold;'>{accuracy:.0%} Correct! 🎯</p>"
+        "</div>"
+    )
+    html_parts.append("<hr>")
     
-    # Visual progress bar for correct answers
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        st.markdown(f"""
-        <div style='text-align: center; padding: 20px; background: #f8f9fa; border-radius: 15px; margin: 10px 0;'>
-            <h3 style='color: #333; margin: 0 0 15px 0;'>You got {correct_count} out of {total_questions} questions right!</h3>
-            <div style='background: #e0e0e0; height: 20px; border-radius: 10px; overflow: hidden; margin: 10px 0;'>
-                <div style='background: #4CAF50; height: 100%; width: {accuracy*100}%; transition: width 0.5s;'></div>
-            </div>
-            <p style='font-size: 1.2rem; color: #4CAF50; margin: 10px 0; font-weight: bold;'>{accuracy:.0%} Correct! 🎯</p>
-        </div>
-        """, unsafe_allow_html=True)
+    # One element for all of the above; one HTML block, so no blank lines between parts
+    st.markdown("\n".join(html_parts), unsafe_allow_html=True)
     
     # Big friendly action buttons
-    st.markdown("---")
     col1, col2 = st.columns(2)
     
     with col1:
         if st.button("🔄 Try Again!", use_container_width=True, type="primary"):
             # Reset session state
-            for key in list(st.session_state.keys()):
-                if key.startswith(('test_', 'current_', 'question_', 'student_', 'adaptive_', 'answer_')):
-                    del st.session_state[key]
+            for key in _RESET_KEYS:
+                ss.pop(key, None)
             st.rerun()
     
     with col2:
         if st.button("🔍 See All Questions", use_container_width=True):
             show_detailed_results()
 
+def _render_choice_answer(question: Dict, item: Dict) -> str:
+    """Show the chosen option, plus the correct one if wrong"""
+    parts = f"<p><b>Your answer:</b> {escape(str(question['options'][item['answer']]))}</p>"
+    if not item['correct']:
+        parts += f"<p><b>Correct answer:</b> {escape(str(question['options'][question['correct_answer']]))}</p>"
+    return parts
+
+def _render_multiple_choice_detail(question: Dict, item: Dict) -> str:
+    return f"<p><b>Question:</b> {escape(question['sentence'])}</p>" + _render_choice_answer(question, item)
+
+def _render_pronunciation_detail(question: Dict, item: Dict) -> str:
+    return (
+        f"<p><b>Word:</b> {escape(question['target_word'])}</p>"
+        f"<p><b>Your assessment:</b> {'Good' if item['answer'] else 'Needs practice'}</p>"
+    )
+
+def _render_image_choice_detail(question: Dict, item: Dict) -> str:
+    return f"<p><b>Image:</b> {escape(question['image_description'])}</p>" + _render_choice_answer(question, item)
+
+# Per-mechanic HTML renderers for the detailed results; other mechanics show just the result
+_DETAIL_RENDERERS = {
+    'multiple-choice-text-text': _render_multiple_choice_detail,
+    'word-pronunciation-practice': _render_pronunciation_detail,
+    'image-single-choice-from-texts': _render_image_choice_detail
+}
+
 def show_detailed_results():
-    """Show detailed question-by-question results"""
+    """Show detailed question-by-question results as native <details> accordions"""
+    ss = st.session_state
     st.subheader("📋 Detailed Results")
     
-    for i, item in enumerate(st.session_state.test_history, 1):
-        question = item['question']
+    rows = []
+    for i, item in enumerate(ss.test_history, 1):
+        question = resolve_question(item)
+        render_detail = _DETAIL_RENDERERS.get(question['mechanic'])
+        detail_html = render_detail(question, item) if render_detail else ""
+        status = "✅" if item['correct'] else "❌"
         
-        with st.expander(f"Question {i}: {question['mechanic'].replace('-', ' ').title()}"):
-            col1, col2 = st.columns([3, 1])
-            
-            with col1:
-                if question['mechanic'] == 'multiple-choice-text-text':
-                    st.write(f"**Question:** {question['sentence']}")
-                    st.write(f"**Your answer:** {question['options'][item['answer']]}")
-                    if not item['correct']:
-                        st.write(f"**Correct answer:** {question['options'][question['correct_answer']]}")
-                
-                elif question['mechanic'] == 'word-pronunciation-practice':
-                    st.write(f"**Word:** {question['target_word']}")
-                    st.write(f"**Your assessment:** {'Good' if item['answer'] else 'Needs practice'}")
-                
-                elif question['mechanic'] == 'image-single-choice-from-texts':
-                    st.write(f"**Image:** {question['image_description']}")
-                    st.write(f"**Your answer:** {question['options'][item['answer']]}")
-                    if not item['correct']:
-                        st.write(f"**Correct answer:** {question['options'][question['correct_answer']]}")
-            
-            with col2:
-                status = "✅" if item['correct'] else "❌"
-                st.markdown(f"**Result:** {status}")
-                st.caption(f"Level {question.get('assigned_level', 'Unknown')}")
+        rows.append(
+            "<details style='border: 1px solid #e0e0e0; border-radius: 8px; padding: 8px 12px; margin: 8px 0;'>"
+            f"<summary>Question {i}: {question['mechanic'].replace('-', ' ').title()}</summary>"
+            "<div style='display: flex; gap: 1rem;'>"
+            f"<div style='flex: 3;'>{detail_html}</div>"
+            f"<div style='flex: 1;'><p><b>Result:</b> {status}</p>"
+            f"<p style='color: #888; font-size: 0.85rem;'>Level {question.get('assigned_level', 'Unknown')}</p></div>"
+            "</div>"
+            "</details>"
+        )
+    
+    # One markdown element instead of an expander widget tree per question
+    st.markdown("\n".join(rows), unsafe_allow_html=True)
 
 def main():
     """Main application logic"""
+    inject_custom_styles()
+    
     # Initialize session state
     initialize_session_state()
+    # Debug mode is read from the URL once per session
+    st.session_state.setdefault('debug_mode', st.query_params.get('debug') == '1')
     
     # Check prerequisites
     check_prerequisites()
     
+    # Feedback for the previous answer (non-blocking)
+    feedback = st.session_state.pop('last_feedback', None)
+    if feedback:
+        st.toast(feedback)
+    
     # Route to appropriate screen
     if not st.session_state.test_started:
         show_welcome_screen()
@@ -556,7 +712,12 @@ def main():
     else:
         show_test_interface()
     
-    # Sidebar with debug info (always visible for demo)
+    # Sidebar with debug info (enable with ?debug=1 in the URL)
+    if st.session_state.debug_mode:
+        show_debug_sidebar()
+
+def show_debug_sidebar():
+    """Show adaptive engine state in the sidebar"""
     st.sidebar.markdown("### 🔧 Debug Info")
     if st.session_state.adaptive_engine:
         # Create a performance history showing all answers (not just the window)
@@ -569,7 +730,7 @@ def main():
             "Current Level": st.session_state.adaptive_engine.current_level,
             "Questions Answered": len(st.session_state.test_history),
             "Performance History": performance_history,
-            "Recent Window": st.session_state.adaptive_engine.performance_window,
+            "Recent Window": list(st.session_state.adaptive_engine.performance_window),
             "Test Started": st.session_state.test_started,
             "Test Completed": st.session_state.test_completed
         })
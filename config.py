@@ -18,6 +18,8 @@ MODEL_NAME = 'gemini-2.5-pro'
 QUESTIONS_PER_TEST = 15
 CALIBRATION_QUESTIONS = 3
 PERFORMANCE_WINDOW_SIZE = 5
+# Seconds the results screen waits for the AI analysis before using the rule-based placement
+ANALYSIS_TIMEOUT_SECONDS = 90
 
 # Adaptive Thresholds
 LEVEL_UP_THRESHOLD = 0.8
@@ -38,4 +40,5 @@ MVP_MECHANICS = [
 DATA_DIR = 'data'
 CURRICULUM_DIR = os.path.join(DATA_DIR, 'curriculum')
 QUESTIONS_FILE = os.path.join(DATA_DIR, 'questions.json')
-RESULTS_DIR = os.path.join(DATA_DIR, 'test_results')
\ No newline at end of file
+RESULTS_DIR = os.path.join(DATA_DIR, 'test_results')
+CUSTOM_CSS_FILE = os.path.join('assets', 'custom.css')
\ No newline at end of file
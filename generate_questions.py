@@ -1,6 +1,9 @@
 # Question bank generator script
 import json
 import os
+import orjson
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
 from dotenv import load_dotenv
 
@@ -15,6 +18,7 @@ except:
     from config import GEMINI_API_KEY
 
 from config import MODEL_NAME, CURRICULUM_DIR, QUESTIONS_FILE, MVP_MECHANICS
+from lib.gemini_batch import run_inline_batch
 
 client = genai.Client(api_key=GEMINI_API_KEY)
 
@@ -30,28 +34,8 @@ def load_curriculum_data():
         vocabulary = json.load(f)
     return levels, competencies, grammar, vocabulary
 
-def generate_questions_prompt(level, mechanic, curriculum_data):
-    """Create prompt for question generation"""
-    levels_data, competencies, grammar, vocabulary = curriculum_data
-    
-    # Filter data for specific level
-    level_competencies = [c for c in competencies if c['novakid_level'] == level]
-    level_grammar = [g for g in grammar if g['novakid_level'] == level]
-    level_vocabulary = [v for v in vocabulary if v['novakid_level'] == level]
-    
-    prompt = f"""You are an ESL curriculum expert creating placement test questions for children aged 4-12.
-
-LEVEL: Novakid Level {level} ({levels_data['levels'][level]['cefr_mapping']})
-MECHANIC: {mechanic}
-
-CURRICULUM DATA:
-Competencies: {json.dumps(level_competencies[:5])}
-Grammar: {json.dumps(level_grammar[:5])}
-Vocabulary: {json.dumps(level_vocabulary[:5])}
-
-Generate exactly 10 questions for {mechanic} mechanic at Novakid Level {level}.
-
-QUESTION FORMATS BY MECHANIC:
+# Output formats shared by every prompt; only the example ids depend on {level}
+MECHANIC_FORMATS = """QUESTION FORMATS BY MECHANIC:
 
 For 'multiple-choice-text-text':
 Create grammar questions testing verb forms, modal verbs, prepositions, articles, etc. Focus on single word choices.
@@ -168,176 +152,263 @@ Requirements:
 - Clear, unambiguous correct answers
 - Varied topics to maintain engagement
 
-Return ONLY a valid JSON array with 10 questions. No additional text."""
+"""
+
+def index_curriculum(curriculum_data):
+    """Pre-serialize each level's curriculum snippets once"""
+    levels_data, competencies, grammar, vocabulary = curriculum_data
+    
+    curriculum_index = {}
+    for level in range(6):  # Levels 0-5
+        curriculum_index[level] = {
+            'cefr': levels_data['levels'][level]['cefr_mapping'],
+            'competencies': json.dumps([c for c in competencies if c['novakid_level'] == level][:5]),
+            'grammar': json.dumps([g for g in grammar if g['novakid_level'] == level][:5]),
+            'vocabulary': json.dumps([v for v in vocabulary if v['novakid_level'] == level][:5])
+        }
+    return curriculum_index
+
+def generate_questions_prompt(level, mechanic, curriculum_index):
+    """Create prompt for question generation"""
+    level_data = curriculum_index[level]
+    
+    prompt = f"""You are an ESL curriculum expert creating placement test questions for children aged 4-12.
+
+LEVEL: Novakid Level {level} ({level_data['cefr']})
+MECHANIC: {mechanic}
+
+CURRICULUM DATA:
+Competencies: {level_data['competencies']}
+Grammar: {level_data['grammar']}
+Vocabulary: {level_data['vocabulary']}
+
+Generate exactly 10 questions for {mechanic} mechanic at Novakid Level {level}.
+
+{MECHANIC_FORMATS.format(level=level)}Return ONLY a valid JSON array with 10 questions. No additional text."""
 
     return prompt
 
-def generate_questions():
-    """Generate questions for all levels and mechanics"""
-    curriculum_data = load_curriculum_data()
-    levels_data, _, _, _ = curriculum_data
+# Concurrent requests for direct (non-batch) generation
+DIRECT_MAX_WORKERS = 8
+
+def get_level_mechanics(level):
+    """Mechanics available at a given level"""
+    level_mechanics = []
     
-    all_questions = {}
+    if level >= 0:
+        level_mechanics.append('word-pronunciation-practice')
+        level_mechanics.append('audio-single-choice-from-images')
+        level_mechanics.append('sentence-pronunciation-practice')
+        level_mechanics.append('audio-category-sorting')
+    if level >= 1:
+        level_mechanics.append('image-single-choice-from-texts')
+        level_mechanics.append('sentence-scramble')
+    if level >= 2:
+        level_mechanics.append('multiple-choice-text-text')
     
+    return [m for m in level_mechanics if m in MVP_MECHANICS]
+
+def build_generation_tasks(curriculum_data):
+    """List every (level, mechanic, prompt) to generate"""
+    curriculum_index = index_curriculum(curriculum_data)
+    tasks = []
     for level in range(6):  # Levels 0-5
-        level_questions = []
-        level_mechanics = []
-        
-        # Determine which mechanics are available for this level
-        if level >= 0:
-            level_mechanics.append('word-pronunciation-practice')
-            level_mechanics.append('audio-single-choice-from-images')
-            level_mechanics.append('sentence-pronunciation-practice')
-            level_mechanics.append('audio-category-sorting')
-        if level >= 1:
-            level_mechanics.append('image-single-choice-from-texts')
-            level_mechanics.append('sentence-scramble')
-        if level >= 2:
-            level_mechanics.append('multiple-choice-text-text')
+        for mechanic in get_level_mechanics(level):
+            tasks.append((level, mechanic, generate_questions_prompt(level, mechanic, curriculum_index)))
+    return tasks
+
+def parse_questions_response(questions_text):
+    """Parse a model response into a list of questions"""
+    questions_text = questions_text.strip()
+    
+    # Clean up response - remove markdown if present (partition stops at the first fence)
+    if '```json' in questions_text:
+        questions_text = questions_text.partition('```json')[2].partition('```')[0]
+    elif '```' in questions_text:
+        questions_text = questions_text.partition('```')[2].partition('```')[0]
+    
+    return orjson.loads(questions_text)
+
+def run_batch(tasks):
+    """Submit all prompts as one Gemini batch job and wait for it
+    
+    Returns a list aligned with tasks: response text, or None for failed rows.
+    Raises if the job can't be created or doesn't succeed as a whole, so the
+    caller never mistakes a dead job for rows that merely need fallbacks.
+    """
+    inline_requests = [
+        {'contents': [{'parts': [{'text': prompt}], 'role': 'user'}]}
+        for _, _, prompt in tasks
+    ]
+    
+    inline_responses = run_inline_batch(client, MODEL_NAME, inline_requests, 'novakid-question-bank', verbose=True)
+    
+    results = []
+    for inline_response in inline_responses:
+        if inline_response is not None and inline_response.response:
+            results.append(inline_response.response.text)
+        else:
+            print(f"  Batch row error: {getattr(inline_response, 'error', 'no response')}")
+            results.append(None)
+    return results
+
+def _generate_one(prompt):
+    """Direct generate_content call; None on error"""
+    try:
+        return client.models.generate_content(model=MODEL_NAME, contents=prompt).text
+    except Exception as e:
+        print(f"  Request error: {e}")
+        return None
+
+def run_direct(tasks):
+    """Call the API directly, several prompts at a time
+    
+    The calls are network-bound, so threads overlap the waits.
+    Returns a list aligned with tasks like run_batch.
+    """
+    with ThreadPoolExecutor(max_workers=DIRECT_MAX_WORKERS) as executor:
+        return list(executor.map(_generate_one, [prompt for _, _, prompt in tasks]))
+
+def generate_questions(use_batch=True):
+    """Generate questions for all levels and mechanics
+    
+    Returns False, without touching the questions file, if generation failed as a whole.
+    """
+    curriculum_data = load_curriculum_data()
+    tasks = build_generation_tasks(curriculum_data)
+    
+    all_questions = {str(level): [] for level in range(6)}
+    
+    # Responses come back in submission order
+    try:
+        responses = run_batch(tasks) if use_batch else run_direct(tasks)
+    except Exception as e:
+        # A failed job says nothing about the prompts; keep the existing bank
+        print(f"Batch generation failed, {QUESTIONS_FILE} left unchanged: {e}")
+        return False
+    
+    for (level, mechanic, _), questions_text in zip(tasks, responses):
+        print(f"Questions for Level {level}, Mechanic: {mechanic}")
         
-        for mechanic in level_mechanics:
-            if mechanic not in MVP_MECHANICS:
-                continue
-                
-            print(f"Generating questions for Level {level}, Mechanic: {mechanic}")
-            
-            prompt = generate_questions_prompt(level, mechanic, curriculum_data)
+        try:
+            if questions_text is None:
+                raise ValueError("no response from model")
+            questions = parse_questions_response(questions_text)
+            all_questions[str(level)].extend(questions)
+            print(f"  Generated {len(questions)} questions")
             
-            try:
-                response = client.models.generate_content(model=MODEL_NAME, contents=prompt)
-                questions_text = response.text.strip()
-                
-                # Clean up response - remove markdown if present
-                if '```json' in questions_text:
-                    questions_text = questions_text.split('```json')[1].split('```')[0]
-                elif '```' in questions_text:
-                    questions_text = questions_text.split('```')[1].split('```')[0]
-                
-                questions = json.loads(questions_text)
-                level_questions.extend(questions)
-                print(f"  Generated {len(questions)} questions")
-                
-            except Exception as e:
-                print(f"  Error generating questions: {e}")
-                # Fallback: create sample questions manually
-                level_questions.extend(create_fallback_questions(level, mechanic))
-        
-        all_questions[str(level)] = level_questions
+        except Exception as e:
+            print(f"  Error generating questions: {e}")
+            # Fallback: create sample questions manually
+            all_questions[str(level)].extend(create_fallback_questions(level, mechanic))
     
     # Save generated questions
     os.makedirs(os.path.dirname(QUESTIONS_FILE), exist_ok=True)
-    with open(QUESTIONS_FILE, 'w') as f:
-        json.dump(all_questions, f, indent=2)
+    # Serialize once and write the whole buffer (a buffered write never returns short)
+    with open(QUESTIONS_FILE, 'wb') as f:
+        f.write(orjson.dumps(all_questions, option=orjson.OPT_INDENT_2))
     
     print(f"\nGenerated {sum(len(q) for q in all_questions.values())} total questions")
     print(f"Saved to {QUESTIONS_FILE}")
+    return True
+
+# Id codes used in question ids, e.g. L2_MC_001
+MECHANIC_CODES = {
+    'multiple-choice-text-text': 'MC',
+    'word-pronunciation-practice': 'WP',
+    'image-single-choice-from-texts': 'IS',
+    'audio-single-choice-from-images': 'AI',
+    'sentence-pronunciation-practice': 'SP',
+    'sentence-scramble': 'SS',
+    'audio-category-sorting': 'ACS'
+}
+
+# One sample question per mechanic (without id) for when generation fails
+FALLBACK_TEMPLATES = {
+    'multiple-choice-text-text': {
+        "mechanic": "multiple-choice-text-text",
+        "sentence": "I ___ a student.",
+        "options": ["am", "is", "are", "be"],
+        "correct_answer": 0,
+        "skill": "Grammar",
+        "difficulty": 0.2,
+        "grammar_point": "be verb"
+    },
+    'word-pronunciation-practice': {
+        "mechanic": "word-pronunciation-practice",
+        "target_word": "cat",
+        "phonetic": "/kæt/",
+        "image_description": "Small furry pet animal",
+        "skill": "Pronunciation",
+        "difficulty": 0.1,
+        "word_type": "noun"
+    },
+    'image-single-choice-from-texts': {
+        "mechanic": "image-single-choice-from-texts",
+        "image_description": "Red round fruit",
+        "options": ["apple", "banana", "orange", "grape"],
+        "correct_answer": 0,
+        "skill": "Vocabulary Recognition",
+        "difficulty": 0.2,
+        "topic": "fruits"
+    },
+    'audio-single-choice-from-images': {
+        "mechanic": "audio-single-choice-from-images",
+        "target_audio": "cat",
+        "image_options": ["Small furry pet animal", "Large brown dog", "Colorful bird flying"],
+        "correct_answer": 0,
+        "skill": "Listening Comprehension",
+        "difficulty": 0.2,
+        "topic": "animals"
+    },
+    'sentence-pronunciation-practice': {
+        "mechanic": "sentence-pronunciation-practice",
+        "target_sentence": "Hello, how are you?",
+        "phonetic": "/həˈloʊ haʊ ɑr ju/",
+        "image_description": "Two friends waving and smiling",
+        "skill": "Sentence Pronunciation",
+        "difficulty": 0.3,
+        "sentence_type": "greeting"
+    },
+    'sentence-scramble': {
+        "mechanic": "sentence-scramble",
+        "sentence_template": "___ ___ ___ ___",
+        "word_options": ["I", "am", "a", "student"],
+        "correct_order": [0, 1, 2, 3],
+        "skill": "Sentence Structure",
+        "difficulty": 0.3,
+        "grammar_point": "word order",
+        "full_sentence": "I am a student"
+    },
+    'audio-category-sorting': {
+        "mechanic": "audio-category-sorting",
+        "categories": [
+            {"name": "Animals", "image_description": "Various cute animals like cats, dogs, birds"},
+            {"name": "Food", "image_description": "Delicious food items like fruits, vegetables, snacks"}
+        ],
+        "audio_items": [
+            {"word": "cat", "category_index": 0},
+            {"word": "apple", "category_index": 1},
+            {"word": "dog", "category_index": 0},
+            {"word": "banana", "category_index": 1}
+        ],
+        "skill": "Vocabulary Categorization",
+        "difficulty": 0.3,
+        "topic": "category sorting"
+    }
+}
 
 def create_fallback_questions(level, mechanic):
     """Create sample questions if generation fails"""
-    fallback = []
-    
-    if mechanic == 'multiple-choice-text-text':
-        fallback = [
-            {
-                "id": f"L{level}_MC_FALLBACK_001",
-                "mechanic": "multiple-choice-text-text",
-                "sentence": "I ___ a student.",
-                "options": ["am", "is", "are", "be"],
-                "correct_answer": 0,
-                "skill": "Grammar",
-                "difficulty": 0.2,
-                "grammar_point": "be verb"
-            }
-        ]
-    elif mechanic == 'word-pronunciation-practice':
-        fallback = [
-            {
-                "id": f"L{level}_WP_FALLBACK_001",
-                "mechanic": "word-pronunciation-practice",
-                "target_word": "cat",
-                "phonetic": "/kæt/",
-                "image_description": "Small furry pet animal",
-                "skill": "Pronunciation",
-                "difficulty": 0.1,
-                "word_type": "noun"
-            }
-        ]
-    elif mechanic == 'image-single-choice-from-texts':
-        fallback = [
-            {
-                "id": f"L{level}_IS_FALLBACK_001",
-                "mechanic": "image-single-choice-from-texts",
-                "image_description": "Red round fruit",
-                "options": ["apple", "banana", "orange", "grape"],
-                "correct_answer": 0,
-                "skill": "Vocabulary Recognition",
-                "difficulty": 0.2,
-                "topic": "fruits"
-            }
-        ]
-    elif mechanic == 'audio-single-choice-from-images':
-        fallback = [
-            {
-                "id": f"L{level}_AI_FALLBACK_001",
-                "mechanic": "audio-single-choice-from-images",
-                "target_audio": "cat",
-                "image_options": ["Small furry pet animal", "Large brown dog", "Colorful bird flying"],
-                "correct_answer": 0,
-                "skill": "Listening Comprehension",
-                "difficulty": 0.2,
-                "topic": "animals"
-            }
-        ]
-    elif mechanic == 'sentence-pronunciation-practice':
-        fallback = [
-            {
-                "id": f"L{level}_SP_FALLBACK_001",
-                "mechanic": "sentence-pronunciation-practice",
-                "target_sentence": "Hello, how are you?",
-                "phonetic": "/həˈloʊ haʊ ɑr ju/",
-                "image_description": "Two friends waving and smiling",
-                "skill": "Sentence Pronunciation",
-                "difficulty": 0.3,
-                "sentence_type": "greeting"
-            }
-        ]
-    elif mechanic == 'sentence-scramble':
-        fallback = [
-            {
-                "id": f"L{level}_SS_FALLBACK_001",
-                "mechanic": "sentence-scramble",
-                "sentence_template": "___ ___ ___ ___",
-                "word_options": ["I", "am", "a", "student"],
-                "correct_order": [0, 1, 2, 3],
-                "skill": "Sentence Structure",
-                "difficulty": 0.3,
-                "grammar_point": "word order",
-                "full_sentence": "I am a student"
-            }
-        ]
-    elif mechanic == 'audio-category-sorting':
-        fallback = [
-            {
-                "id": f"L{level}_ACS_FALLBACK_001",
-                "mechanic": "audio-category-sorting",
-                "categories": [
-                    {"name": "Animals", "image_description": "Various cute animals like cats, dogs, birds"},
-                    {"name": "Food", "image_description": "Delicious food items like fruits, vegetables, snacks"}
-                ],
-                "audio_items": [
-                    {"word": "cat", "category_index": 0},
-                    {"word": "apple", "category_index": 1},
-                    {"word": "dog", "category_index": 0},
-                    {"word": "banana", "category_index": 1}
-                ],
-                "skill": "Vocabulary Categorization",
-                "difficulty": 0.3,
-                "topic": "category sorting"
-            }
-        ]
+    template = FALLBACK_TEMPLATES.get(mechanic)
+    if not template:
+        return []
     
-    return fallback
+    # Shallow copy is enough: fallbacks are only serialized to the questions file
+    return [{"id": f"L{level}_{MECHANIC_CODES[mechanic]}_FALLBACK_001", **template}]
 
 if __name__ == "__main__":
     print("Starting question generation...")
-    generate_questions()
\ No newline at end of file
+    # --direct skips the batch queue and calls the API concurrently
+    if not generate_questions(use_batch='--direct' not in sys.argv):
+        sys.exit(1)
\ No newline at end of file
@@ -1,18 +1,91 @@
 # Adaptive test logic
-import json
+import os
 import random
-from typing import Dict, List, Optional
+from collections import deque
+from functools import lru_cache
+import orjson
+from typing import Dict, List, Optional, Tuple
+
+class QuestionCatalog:
+    """Immutable question bank shared by all engines in the process"""
+    
+    def __init__(self, questions_file: str):
+        with open(questions_file, 'rb') as f:
+            self.question_bank = orjson.loads(f.read())
+        
+        # Lookup by question ID across all levels
+        self.questions_by_id = {
+            q['id']: q for level_questions in self.question_bank.values() for q in level_questions
+        }
+        
+        # Per level: mechanic -> questions, both in bank order
+        self.questions_by_level = {}
+        for level_key, level_questions in self.question_bank.items():
+            by_mechanic = {}
+            for q in level_questions:
+                by_mechanic.setdefault(q['mechanic'], []).append(q)
+            self.questions_by_level[int(level_key)] = by_mechanic
+    
+    def get_question(self, question_id: str) -> Optional[Dict]:
+        """Get question by ID"""
+        return self.questions_by_id.get(question_id)
+
+@lru_cache(maxsize=256)
+def _exclude_recent(mechanics: Tuple[str, ...], recent: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Mechanics not in the recent tail; pure, so results are shared by all engines"""
+    return tuple(m for m in mechanics if m not in recent)
+
+@lru_cache(maxsize=4)
+def _load_catalog_version(questions_file: str, mtime: float) -> QuestionCatalog:
+    return QuestionCatalog(questions_file)
+
+def load_catalog(questions_file: str) -> QuestionCatalog:
+    """Parse and index a questions file once per process
+    
+    Keyed on modification time, so a regenerated bank is picked up while
+    engines already running keep the catalog they started with. This is the
+    only catalog cache: the app's get_question_catalog goes through it too.
+    """
+    return _load_catalog_version(questions_file, os.path.getmtime(questions_file))
 
 class AdaptiveEngine:
     """Simple adaptive testing engine with deterministic rules"""
     
-    def __init__(self, questions_file: str, 
+    # Mechanic categories for dynamic balancing (membership checks only)
+    AUDIO_MECHANICS = frozenset([
+        'word-pronunciation-practice', 
+        'audio-single-choice-from-images', 
+        'sentence-pronunciation-practice', 
+        'audio-category-sorting'
+    ])
+    TEXT_MECHANICS = frozenset([
+        'image-single-choice-from-texts', 
+        'multiple-choice-text-text', 
+        'sentence-scramble'
+    ])
+    
+    # Mechanic availability by level - matches curriculum constraints
+    mechanic_availability = {
+        0: ('word-pronunciation-practice', 'audio-single-choice-from-images', 'sentence-pronunciation-practice', 'audio-category-sorting'),
+        1: ('word-pronunciation-practice', 'image-single-choice-from-texts', 'audio-single-choice-from-images', 'sentence-pronunciation-practice', 'sentence-scramble', 'audio-category-sorting'),
+        2: ('word-pronunciation-practice', 'image-single-choice-from-texts', 'multiple-choice-text-text', 'audio-single-choice-from-images', 'sentence-pronunciation-practice', 'sentence-scramble', 'audio-category-sorting'),
+        3: ('word-pronunciation-practice', 'image-single-choice-from-texts', 'multiple-choice-text-text', 'audio-single-choice-from-images', 'sentence-pronunciation-practice', 'sentence-scramble', 'audio-category-sorting'),
+        4: ('word-pronunciation-practice', 'image-single-choice-from-texts', 'multiple-choice-text-text', 'audio-single-choice-from-images', 'sentence-pronunciation-practice', 'sentence-scramble', 'audio-category-sorting'),
+        5: ('word-pronunciation-practice', 'image-single-choice-from-texts', 'multiple-choice-text-text', 'audio-single-choice-from-images', 'sentence-pronunciation-practice', 'sentence-scramble', 'audio-category-sorting')
+    }
+    
+    def __init__(self, questions_file: Optional[str] = None, 
                  early_test_questions: int = 5,
                  max_exploration_distance: int = 2,
                  cooldown_questions: int = 2,
-                 momentum_decay: float = 0.7):
-        with open(questions_file) as f:
-            self.question_bank = json.load(f)
+                 momentum_decay: float = 0.7,
+                 catalog: Optional[QuestionCatalog] = None,
+                 seed: Optional[int] = None):
+        # Question bank is read-only here, so a shared catalog can be reused across sessions
+        self.catalog = catalog if catalog is not None else load_catalog(questions_file)
+        self.question_bank = self.catalog.question_bank
+        # Per-engine RNG; pass a seed for reproducible question sequences
+        self._rng = random.Random(seed)
         
         # Configurable parameters
         self.early_test_questions = early_test_questions  # Questions before full exploration
@@ -21,57 +94,79 @@ class AdaptiveEngine:
         self.momentum_decay = momentum_decay  # Momentum reduction after level jumps
         
         self.current_level = 1  # Start at Level 1
-        self.performance_window = []  # Track last N answers
+        self.performance_window = deque(maxlen=5)  # Track last N answers
+        # Running sums so accuracy checks don't re-scan the window or history
+        self.window_correct = 0  # Correct answers in performance_window
+        self.recent_window = deque(maxlen=3)  # Last 3 answers
+        self.recent_correct = 0  # Correct answers in recent_window
+        self.total_correct = 0  # Correct answers in question_history
         self.used_questions = set()  # Track used question IDs
+        # Unused questions per level and mechanic; selection removes from here instead of filtering
+        self.remaining = {
+            level: {mechanic: list(pool) for mechanic, pool in by_mechanic.items()}
+            for level, by_mechanic in self.catalog.questions_by_level.items()
+        }
         self.question_history = []  # Full test history
         self.calibration_complete = False
         self.calibration_count = 0
-        self.recent_mechanics = []  # Track last few mechanics for diversity
+        self.recent_mechanics = deque(maxlen=5)  # Track last few mechanics for diversity
+        self.recent_tail = deque(maxlen=2)  # Last 2 mechanics, checked on every selection
+        
+        # Available mechanics per (level, is_audio) category, in curriculum order
+        self._category_mechanics = {
+            (level, is_audio): tuple(
+                m for m in mechanics
+                if m in (self.AUDIO_MECHANICS if is_audio else self.TEXT_MECHANICS)
+            )
+            for level, mechanics in self.mechanic_availability.items()
+            for is_audio in (True, False)
+        }
         
         # Momentum system variables
         self.level_momentum = 0.0  # Track direction and speed of level changes (-2.0 to +2.0)
         self.consecutive_successes = 0  # Track consecutive correct answers
         self.level_change_cooldown = 0  # Prevent rapid oscillation between levels
-        
-        # Mechanic categories for dynamic balancing
-        self.AUDIO_MECHANICS = [
-            'word-pronunciation-practice', 
-            'audio-single-choice-from-images', 
-            'sentence-pronunciation-practice', 
-            'audio-category-sorting'
-        ]
-        self.TEXT_MECHANICS = [
-            'image-single-choice-from-texts', 
-            'multiple-choice-text-text', 
-            'sentence-scramble'
-        ]
-        
-        # Mechanic availability by level - matches curriculum constraints
-        self.mechanic_availability = {
-            0: ['word-pronunciation-practice', 'audio-single-choice-from-images', 'sentence-pronunciation-practice', 'audio-category-sorting'],
-            1: ['word-pronunciation-practice', 'image-single-choice-from-texts', 'audio-single-choice-from-images', 'sentence-pronunciation-practice', 'sentence-scramble', 'audio-category-sorting'],
-            2: ['word-pronunciation-practice', 'image-single-choice-from-texts', 'multiple-choice-text-text', 'audio-single-choice-from-images', 'sentence-pronunciation-practice', 'sentence-scramble', 'audio-category-sorting'],
-            3: ['word-pronunciation-practice', 'image-single-choice-from-texts', 'multiple-choice-text-text', 'audio-single-choice-from-images', 'sentence-pronunciation-practice', 'sentence-scramble', 'audio-category-sorting'],
-            4: ['word-pronunciation-practice', 'image-single-choice-from-texts', 'multiple-choice-text-text', 'audio-single-choice-from-images', 'sentence-pronunciation-practice', 'sentence-scramble', 'audio-category-sorting'],
-            5: ['word-pronunciation-practice', 'image-single-choice-from-texts', 'multiple-choice-text-text', 'audio-single-choice-from-images', 'sentence-pronunciation-practice', 'sentence-scramble', 'audio-category-sorting']
-        }
     
-    def _select_category_balanced(self, available_levels: List[int], preferred_mechanics: List[str]) -> Optional[Dict]:
-        """Select question with true 50/50 category balance"""
+    @classmethod
+    def from_catalog(cls, catalog: QuestionCatalog, **kwargs) -> 'AdaptiveEngine':
+        """Create engine with fresh per-session state on top of a shared catalog"""
+        return cls(catalog=catalog, **kwargs)
+    
+    def _unused_candidates(self, level: int, mechanics: List[str], limit: int) -> List[Dict]:
+        """First `limit` unused questions at a level with one of the given mechanics"""
+        candidates = []
+        for mechanic, pool in self.remaining.get(level, {}).items():
+            if mechanic in mechanics:
+                candidates.extend(pool[:limit - len(candidates)])
+                if len(candidates) >= limit:
+                    break
+        return candidates
+    
+    def _mark_used(self, question: Dict):
+        """Record a question as used and drop it from its remaining pool"""
+        self.used_questions.add(question['id'])
+        pool = self.remaining[question['assigned_level']][question['mechanic']]
+        for i, q in enumerate(pool):
+            if q['id'] == question['id']:
+                del pool[i]
+                break
+    
+    def _select_category_balanced(self, available_levels: List[int], preferred_mechanics: List[str],
+                                  is_calibration: bool = False) -> Optional[Dict]:
+        """Select question with true 50/50 category balance
+        
+        Returns a new dict; catalog questions are shared and never modified.
+        """
         # First decide: audio or text category (50/50 coin flip)
-        use_audio_category = random.random() < 0.5
+        use_audio_category = bool(self._rng.getrandbits(1))
         
         # Try the chosen category first, then fallback to the other
         for attempt_audio in [use_audio_category, not use_audio_category]:
-            # Get mechanics for this category
-            target_mechanics = self.AUDIO_MECHANICS if attempt_audio else self.TEXT_MECHANICS
-            
-            # Filter to available mechanics at current level
-            available_mechanics = self.mechanic_availability[self.current_level]
-            category_mechanics = [m for m in available_mechanics if m in target_mechanics]
+            # Mechanics for this category available at current level
+            category_mechanics = self._category_mechanics[(self.current_level, attempt_audio)]
             
             # Apply diversity filter (prefer recently unused mechanics)
-            diverse_mechanics = [m for m in category_mechanics if m not in self.recent_mechanics[-2:]]
+            diverse_mechanics = _exclude_recent(category_mechanics, tuple(self.recent_tail))
             mechanics_to_try = diverse_mechanics if diverse_mechanics else category_mechanics
             
             
@@ -81,26 +176,18 @@ class AdaptiveEngine:
                 if preferred_in_category:
                     mechanics_to_try = preferred_in_category
             
-            # Collect candidates across all available levels
+            # Collect (level, question) candidates across all available levels
             all_candidates = []
             for level in available_levels:
-                level_questions = self.question_bank.get(str(level), [])
-                candidates = [
-                    q for q in level_questions 
-                    if q['mechanic'] in mechanics_to_try 
-                    and q['id'] not in self.used_questions
-                ]
-                
-                # Add level assignment to candidates
-                for candidate in candidates[:5]:  # Limit per level to avoid dominance
-                    candidate_copy = candidate.copy()
-                    candidate_copy['assigned_level'] = level
-                    all_candidates.append(candidate_copy)
+                # Limit per level to avoid dominance
+                for candidate in self._unused_candidates(level, mechanics_to_try, 5):
+                    all_candidates.append((level, candidate))
             
-            # Select randomly from category candidates
+            # Select randomly from category candidates; only the pick is copied
             if all_candidates:
-                question = random.choice(all_candidates)
-                self.used_questions.add(question['id'])
+                level, candidate = all_candidates[self._rng.randrange(len(all_candidates))]
+                question = {**candidate, 'assigned_level': level, 'is_calibration': is_calibration}
+                self._mark_used(question)
                 self._track_mechanic_usage(question['mechanic'])
                 return question
         
@@ -135,23 +222,16 @@ class AdaptiveEngine:
         
         if self.calibration_count < 3:
             level = calibration_levels[self.calibration_count]
-            level_questions = self.question_bank.get(str(level), [])
             
             # Use diverse mechanics for calibration - respect level constraints
             level_mechanics = self.mechanic_availability[level]
             # Instead of cycling predictably, use all available mechanics for better diversity
             calibration_mechanics = level_mechanics
-            candidates = [
-                q for q in level_questions 
-                if q['mechanic'] in calibration_mechanics 
-                and q['id'] not in self.used_questions
-            ]
             
-            if candidates:
+            if self._unused_candidates(level, calibration_mechanics, 1):
                 # Use category-balanced selection for calibration too
-                question = self._select_category_balanced([level], [])
+                question = self._select_category_balanced([level], [], is_calibration=True)
                 if question:
-                    question['is_calibration'] = True
                     self.calibration_count += 1
                     
                     if self.calibration_count >= 3:
@@ -176,7 +256,7 @@ class AdaptiveEngine:
             return sorted(base_levels)
         
         # Calculate momentum-adjusted exploration distance
-        recent_accuracy = sum(self.performance_window[-3:]) / 3 if len(self.performance_window) >= 3 else 0
+        recent_accuracy = self.recent_correct / 3 if len(self.performance_window) >= 3 else 0
         
         # Progressive exploration distance based on test progress
         questions_answered = len(self.question_history)
@@ -202,7 +282,7 @@ class AdaptiveEngine:
         
         # Level 5 exploration phase - ensure high performers get adequate Level 5 testing
         if self.current_level >= 4 and len(self.question_history) >= 8:
-            overall_accuracy = sum(1 for h in self.question_history if h['correct']) / len(self.question_history)
+            overall_accuracy = self.total_correct / len(self.question_history)
             if overall_accuracy >= 0.85:
                 # Force Level 5 inclusion for comprehensive assessment
                 if 5 not in base_levels:
@@ -219,7 +299,7 @@ class AdaptiveEngine:
         # End-test ceiling push (more conservative than before)
         questions_remaining = 15 - len(self.question_history)
         if questions_remaining <= 3 and len(self.question_history) > 0:
-            overall_accuracy = sum(1 for h in self.question_history if h['correct']) / len(self.question_history)
+            overall_accuracy = self.total_correct / len(self.question_history)
             if overall_accuracy >= 0.85 and self.level_momentum > 1.0:
                 # Only push to next level, not jumping multiple levels
                 max_level = min(5, self.current_level + 1)
@@ -234,16 +314,15 @@ class AdaptiveEngine:
             return available_mechanics
         
         # Get mechanics not used in last 2 questions (reduced from 3 for better diversity)
-        recent_set = set(self.recent_mechanics[-2:])
-        preferred = [m for m in available_mechanics if m not in recent_set]
+        preferred = _exclude_recent(tuple(available_mechanics), tuple(self.recent_tail))
         
         return preferred if preferred else available_mechanics
     
     def _track_mechanic_usage(self, mechanic: str):
         """Track mechanic usage for diversity"""
+        # Bounded deques drop the oldest entry on append
         self.recent_mechanics.append(mechanic)
-        if len(self.recent_mechanics) > 5:
-            self.recent_mechanics.pop(0)
+        self.recent_tail.append(mechanic)
     
     def update_performance(self, question_id: str, correct: bool, response_time: float = 0):
         """Smoother level adjustments with momentum and cooldown system"""
@@ -256,10 +335,17 @@ class AdaptiveEngine:
             'level': self.current_level
         })
         
-        # Update performance window
-        self.performance_window.append(1 if correct else 0)
-        if len(self.performance_window) > 5:
-            self.performance_window.pop(0)
+        # Update performance windows and their running sums (appending drops the oldest)
+        score = 1 if correct else 0
+        if len(self.performance_window) == self.performance_window.maxlen:
+            self.window_correct -= self.performance_window[0]
+        self.performance_window.append(score)
+        self.window_correct += score
+        if len(self.recent_window) == self.recent_window.maxlen:
+            self.recent_correct -= self.recent_window[0]
+        self.recent_window.append(score)
+        self.recent_correct += score
+        self.total_correct += score
         
         # Update momentum based on performance
         if correct:
@@ -276,7 +362,7 @@ class AdaptiveEngine:
         
         # Level adjustment with momentum thresholds and sustained performance requirements
         if len(self.performance_window) >= 3:
-            recent_accuracy = sum(self.performance_window[-3:]) / 3
+            recent_accuracy = self.recent_correct / 3
             
             # Upward level adjustments - require sustained performance
             if recent_accuracy >= 0.9 and self.level_momentum > 1.5:
@@ -310,7 +396,11 @@ class AdaptiveEngine:
                     if self.current_level == 5:
                         # Only drop from Level 5 if really struggling (need 2 consecutive wrong answers)
                         if self.consecutive_successes == 0 and len(self.performance_window) >= 4:
-                            recent_errors = len([x for x in self.performance_window[-4:] if x == 0])
+                            # Last 4 answers = whole window minus the oldest entry once it's full
+                            recent_correct_4 = self.window_correct
+                            if len(self.performance_window) == 5:
+                                recent_correct_4 -= self.performance_window[0]
+                            recent_errors = 4 - recent_correct_4
                             if recent_errors >= 3:  # 3 out of last 4 wrong
                                 self.current_level -= 1
                                 self.level_change_cooldown = self.cooldown_questions
@@ -329,8 +419,7 @@ class AdaptiveEngine:
             return {'level': 1, 'confidence': 0.0}
         
         # Calculate overall accuracy
-        total_correct = sum(1 for h in self.question_history if h['correct'])
-        accuracy = total_correct / len(self.question_history)
+        accuracy = self.total_correct / len(self.question_history)
         
         # Confidence based on number of questions and consistency
         confidence = min(len(self.question_history) / 15, 1.0) * accuracy
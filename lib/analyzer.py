@@ -1,68 +1,67 @@
 # Post-test analysis with LLM
-import json
 import os
+import orjson
 import google.genai as genai
+from functools import lru_cache
 from typing import Dict, List
+from pydantic import BaseModel, Field
 
 # Import API key from config (handles both Streamlit secrets and local .env)
-from config import GEMINI_API_KEY, MODEL_NAME
+from config import GEMINI_API_KEY, MODEL_NAME, ANALYSIS_TIMEOUT_SECONDS
+from .gemini_batch import run_inline_batch
 
-client = genai.Client(api_key=GEMINI_API_KEY)
+# HTTP timeout (ms) so a hung call frees its analysis worker by the results-screen deadline
+client = genai.Client(api_key=GEMINI_API_KEY, http_options={'timeout': ANALYSIS_TIMEOUT_SECONDS * 1000})
 
-def analyze_results(test_history: List[Dict], questions: Dict) -> Dict:
-    """Analyze test results using LLM to determine placement"""
-    
-    # Prepare analysis prompt
-    prompt = create_analysis_prompt(test_history, questions)
-    
-    try:
-        response = client.models.generate_content(model=MODEL_NAME, contents=prompt)
-        result_text = response.text.strip()
-        
-        # Clean JSON response
-        if '```json' in result_text:
-            result_text = result_text.split('```json')[1].split('```')[0]
-        elif '```' in result_text:
-            result_text = result_text.split('```')[1].split('```')[0]
-        
-        analysis = json.loads(result_text)
-        
-        # Add success flag for UI feedback
-        analysis['_analysis_method'] = 'ai'
-        return analysis
-        
-    except Exception as e:
-        error_msg = str(e)
-        print(f"Error in LLM analysis: {error_msg}")
-        
-        # Enhanced fallback with error info
-        fallback_result = simple_analysis(test_history)
-        fallback_result['_analysis_method'] = 'fallback'
-        fallback_result['_analysis_error'] = error_msg
-        
-        return fallback_result
+# CEFR equivalents indexed by Novakid level
+CEFR_LEVELS = ('pre-A1', 'A1', 'A1+', 'A2', 'B1', 'B2')
 
-def create_analysis_prompt(test_history: List[Dict], questions: Dict) -> str:
-    """Create prompt for LLM analysis"""
-    
-    # Enrich history with question details including grammar points
-    detailed_history = []
-    for item in test_history:
-        question = item['question']
-        detailed_history.append({
-            'question_id': question['id'],
-            'level': question.get('assigned_level', 1),
-            'mechanic': question['mechanic'],
-            'skill': question.get('skill', 'Unknown'),
-            'grammar_point': question.get('grammar_point', 'general'),
-            'correct': item['correct'],
-            'response_time': item.get('response_time', 0)
-        })
-    
-    prompt = f"""Analyze this student's ESL placement test results to determine their Novakid level.
+# Fallback recommendation for a weak skill (Grammar uses failed grammar points when known)
+SKILL_RECOMMENDATIONS = {
+    'Grammar': "Review grammar fundamentals",
+    'Sentence Structure': "Practice word order and sentence formation",
+    'Vocabulary': "Expand vocabulary through reading and practice",
+    'Pronunciation': "Practice pronunciation with audio materials"
+}
+REQUIRED_SKILLS = ('vocabulary', 'pronunciation', 'grammar')
+
+# Response schema enforced by Gemini structured output
+class Placement(BaseModel):
+    novakid_level: int = Field(description="Placement level, 0-5")
+    confidence: float = Field(description="Confidence in the placement, 0.0-1.0")
+    cefr_equivalent: str = Field(description="CEFR label: pre-A1, A1, A1+, A2, B1 or B2")
+    level_justification: str = Field(description="One sentence explaining the placement")
+
+class SkillScore(BaseModel):
+    score: float = Field(description="Skill score, 0.0-1.0")
+    evidence: List[str] = Field(description="Short observations from the results")
+
+class SkillAnalysis(BaseModel):
+    vocabulary: SkillScore
+    pronunciation: SkillScore
+    grammar: SkillScore
+
+class Recommendations(BaseModel):
+    immediate_focus: List[str] = Field(description="Specific skills to practice next")
+    strengths_to_build_on: List[str]
+    suggested_starting_point: str = Field(description="e.g. 'Begin at Novakid Level 2 with grammar support'")
+    estimated_progress: str = Field(description="e.g. 'Ready for Level 3 in 4-6 weeks with regular practice'")
+
+class PlacementAnalysis(BaseModel):
+    placement: Placement
+    skill_analysis: SkillAnalysis
+    recommendations: Recommendations
+
+ANALYSIS_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': PlacementAnalysis
+}
+
+# Static analysis instructions; only the test history is filled in per call
+ANALYSIS_PROMPT_TEMPLATE = """Analyze this student's ESL placement test results to determine their Novakid level.
 
 TEST RESULTS:
-{json.dumps(detailed_history, indent=2)}
+{history_json}
 
 NOVAKID LEVEL SYSTEM:
 - Level 0 (pre-A1): Complete beginner, basic words only
@@ -92,45 +91,117 @@ IMPORTANT ANALYSIS GUIDELINES:
 - If student failed "sentence-scramble" → recommend "word order practice"
 - If student failed "multiple-choice-text-text" with "modal verbs" → recommend "modal verb practice"
 
-Return ONLY valid JSON in this exact format:
-{{
-  "placement": {{
-    "novakid_level": 2,
-    "confidence": 0.75,
-    "cefr_equivalent": "A1+",
-    "level_justification": "Consistent performance at Level 2 tasks with some Level 3 success"
-  }},
-  "skill_analysis": {{
-    "vocabulary": {{
-      "score": 0.7,
-      "evidence": ["Correctly identified 7/10 vocabulary items", "Struggled with abstract concepts"]
-    }},
-    "pronunciation": {{
-      "score": 0.8,
-      "evidence": ["Good self-assessment on basic words", "Confident with simple sounds"]
-    }},
-    "grammar": {{
-      "score": 0.6,
-      "evidence": ["Understands present simple", "Difficulty with past tense"]
-    }}
-  }},
-  "recommendations": {{
-    "immediate_focus": ["Review past tense forms", "Practice vocabulary for daily activities"],
-    "strengths_to_build_on": ["Good pronunciation foundation", "Strong basic vocabulary"],
-    "suggested_starting_point": "Begin at Novakid Level 2 with grammar support",
-    "estimated_progress": "Ready for Level 3 in 4-6 weeks with regular practice"
-  }}
-}}"""
+Respond with JSON matching the response schema."""
+
+def analyze_results(test_history: List[Dict], questions: Dict) -> Dict:
+    """Analyze test results using LLM to determine placement
+    
+    test_history entries reference questions by ID; questions maps ID -> question.
+    Safe to call from any thread.
+    """
+    
+    # Prepare analysis prompt
+    prompt = create_analysis_prompt(test_history, questions)
+    
+    try:
+        # Parse per call so every caller gets its own dict
+        analysis = orjson.loads(request_analysis(prompt))
+        
+        # Add success flag for UI feedback
+        analysis['_analysis_method'] = 'ai'
+        return analysis
+        
+    except Exception as e:
+        error_msg = str(e)
+        print(f"Error in LLM analysis: {error_msg}")
+        
+        # Enhanced fallback with error info
+        return _fallback_analysis(test_history, questions, error_msg)
+
+def _fallback_analysis(test_history: List[Dict], questions: Dict, error_msg: str) -> Dict:
+    """Rule-based result flagged the same way analyze_results flags it"""
+    fallback_result = simple_analysis(test_history, questions)
+    fallback_result['_analysis_method'] = 'fallback'
+    fallback_result['_analysis_error'] = error_msg
+    return fallback_result
+
+def analyze_results_batch(test_histories: List[List[Dict]], questions: Dict) -> List[Dict]:
+    """Analyze many students' results (e.g. a class) in one Gemini batch job
+    
+    Batch jobs are billed at a discount but may take minutes, so this is for
+    offline cohort scoring, not the live results screen. Each student is one
+    row with the usual prompt and schema; rows that fail get simple_analysis.
+    Returns a list aligned with test_histories.
+    """
+    if not test_histories:
+        return []
+    
+    inline_requests = [
+        {
+            'contents': [{'parts': [{'text': create_analysis_prompt(test_history, questions)}], 'role': 'user'}],
+            'config': ANALYSIS_CONFIG
+        }
+        for test_history in test_histories
+    ]
     
-    return prompt
+    try:
+        inline_responses = run_inline_batch(client, MODEL_NAME, inline_requests, 'novakid-placement-analysis')
+    except Exception as e:
+        error_msg = str(e)
+        print(f"Error in batch LLM analysis: {error_msg}")
+        return [_fallback_analysis(test_history, questions, error_msg) for test_history in test_histories]
+    
+    results = []
+    for test_history, inline_response in zip(test_histories, inline_responses):
+        try:
+            if inline_response is None or not inline_response.response:
+                raise ValueError(f"Batch row error: {getattr(inline_response, 'error', 'no response')}")
+            analysis = orjson.loads(inline_response.response.text)
+            analysis['_analysis_method'] = 'ai'
+            results.append(analysis)
+        except Exception as e:
+            results.append(_fallback_analysis(test_history, questions, str(e)))
+    return results
 
-def simple_analysis(test_history: List[Dict]) -> Dict:
-    """Fallback rule-based analysis if LLM fails"""
+@lru_cache(maxsize=128)
+def request_analysis(prompt: str) -> str:
+    """Get the model's JSON analysis for a prompt
+    
+    The prompt is fully determined by the test history, so identical histories
+    reuse the reply. Errors are raised, not cached, so retries hit the API again.
+    An in-process cache rather than st.cache_data: analyses run on background
+    threads without a Streamlit script context.
+    """
+    response = client.models.generate_content(model=MODEL_NAME, contents=prompt, config=ANALYSIS_CONFIG)
+    
+    # Structured output: the SDK validates the reply against the schema
+    if response.parsed is None:
+        raise ValueError("Model reply did not match the analysis schema")
+    return response.text
 
-    # Calculate basic metrics
-    total_questions = len(test_history)
-    correct_answers = sum(1 for h in test_history if h['correct'])
-    accuracy = correct_answers / total_questions if total_questions > 0 else 0
+def create_analysis_prompt(test_history: List[Dict], questions: Dict) -> str:
+    """Create prompt for LLM analysis"""
+    
+    # Enrich history with question details including grammar points
+    detailed_history = [
+        {
+            'question_id': question['id'],
+            'level': item.get('assigned_level', 1),
+            'mechanic': question['mechanic'],
+            'skill': question.get('skill', 'Unknown'),
+            'grammar_point': question.get('grammar_point', 'general'),
+            'correct': item['correct'],
+            'response_time': item.get('response_time', 0)
+        }
+        for item in test_history
+        for question in (questions[item['question_id']],)
+    ]
+    
+    # Compact JSON: indentation only adds input tokens
+    return ANALYSIS_PROMPT_TEMPLATE.format(history_json=orjson.dumps(detailed_history).decode())
+
+def simple_analysis(test_history: List[Dict], questions: Dict) -> Dict:
+    """Fallback rule-based analysis if LLM fails"""
 
     # Group by level
     level_performance = {}
@@ -140,9 +211,10 @@ def simple_analysis(test_history: List[Dict]) -> Dict:
     failed_grammar_points = []
 
     for item in test_history:
-        level = item['question'].get('assigned_level', 1)
-        skill = item['question'].get('skill', 'Unknown')
-        grammar_point = item['question'].get('grammar_point', 'general')
+        question = questions[item['question_id']]
+        level = item.get('assigned_level', 1)
+        skill = question.get('skill', 'Unknown')
+        grammar_point = question.get('grammar_point', 'general')
 
         # Level performance
         if level not in level_performance:
@@ -162,6 +234,11 @@ def simple_analysis(test_history: List[Dict]) -> Dict:
             if grammar_point != 'general':
                 failed_grammar_points.append(grammar_point)
 
+    # Calculate basic metrics from the per-level totals (no second pass over history)
+    total_questions = len(test_history)
+    correct_answers = sum(perf['correct'] for perf in level_performance.values())
+    accuracy = correct_answers / total_questions if total_questions > 0 else 0
+
     # Determine placement level
     placement_level = 1
     for level in sorted(level_performance.keys()):
@@ -169,16 +246,6 @@ def simple_analysis(test_history: List[Dict]) -> Dict:
         if level_accuracy >= 0.7:
             placement_level = level
     
-    # Map to CEFR
-    cefr_mapping = {
-        0: 'pre-A1',
-        1: 'A1',
-        2: 'A1+',
-        3: 'A2',
-        4: 'B1',
-        5: 'B2'
-    }
-
     # Generate skill-specific scores and recommendations
     skill_scores = {}
     recommendations = []
@@ -193,23 +260,15 @@ def simple_analysis(test_history: List[Dict]) -> Dict:
 
         # Generate recommendations based on performance
         if skill_accuracy < 0.6:
-            if skill == 'Grammar':
-                if failed_grammar_points:
-                    recommendations.extend([f"Practice {point}" for point in set(failed_grammar_points)])
-                else:
-                    recommendations.append("Review grammar fundamentals")
-            elif skill == 'Sentence Structure':
-                recommendations.append("Practice word order and sentence formation")
-            elif skill == 'Vocabulary':
-                recommendations.append("Expand vocabulary through reading and practice")
-            elif skill == 'Pronunciation':
-                recommendations.append("Practice pronunciation with audio materials")
+            if skill == 'Grammar' and failed_grammar_points:
+                recommendations.extend([f"Practice {point}" for point in set(failed_grammar_points)])
+            elif skill in SKILL_RECOMMENDATIONS:
+                recommendations.append(SKILL_RECOMMENDATIONS[skill])
         else:
             strengths.append(f"Strong {skill.lower()} skills")
 
     # Ensure we have the required skill categories
-    required_skills = ['vocabulary', 'pronunciation', 'grammar']
-    for skill in required_skills:
+    for skill in REQUIRED_SKILLS:
         if skill not in skill_scores:
             skill_scores[skill] = {
                 "score": accuracy,
@@ -225,7 +284,7 @@ def simple_analysis(test_history: List[Dict]) -> Dict:
         "placement": {
             "novakid_level": placement_level,
             "confidence": accuracy,
-            "cefr_equivalent": cefr_mapping.get(placement_level, 'A1'),
+            "cefr_equivalent": CEFR_LEVELS[placement_level] if 0 <= placement_level < len(CEFR_LEVELS) else 'A1',
             "level_justification": f"Overall accuracy {accuracy:.1%} with best performance at Level {placement_level}"
         },
         "skill_analysis": skill_scores,
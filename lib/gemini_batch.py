@@ -0,0 +1,35 @@
+# Gemini Batch API job runner shared by question generation and cohort analysis
+import time
+from typing import Any, Dict, List
+
+# Terminal states of a Gemini batch job
+BATCH_DONE_STATES = {'JOB_STATE_SUCCEEDED', 'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'}
+BATCH_POLL_SECONDS = 30
+
+def run_inline_batch(client, model: str, inline_requests: List[Dict], display_name: str, verbose: bool = False) -> List[Any]:
+    """Submit inline requests as one batch job and wait for it to finish
+
+    Returns the job's inlined responses aligned with inline_requests; rows
+    missing from the reply are None. Raises if the job can't be created or
+    doesn't succeed as a whole, so callers can tell a dead job from failed rows.
+    """
+    batch_job = client.batches.create(
+        model=model,
+        src=inline_requests,
+        config={'display_name': display_name}
+    )
+    if verbose:
+        print(f"Submitted batch job {batch_job.name} with {len(inline_requests)} requests")
+
+    while batch_job.state.name not in BATCH_DONE_STATES:
+        time.sleep(BATCH_POLL_SECONDS)
+        batch_job = client.batches.get(name=batch_job.name)
+        if verbose:
+            print(f"  Batch state: {batch_job.state.name}")
+
+    if batch_job.state.name != 'JOB_STATE_SUCCEEDED':
+        raise RuntimeError(f"Batch job ended with {batch_job.state.name}: {batch_job.error}")
+
+    # Guard against a short response list: missing rows come back as None
+    inline_responses = list(batch_job.dest.inlined_responses or [])[:len(inline_requests)]
+    return inline_responses + [None] * (len(inline_requests) - len(inline_responses))
@@ -1,48 +1,88 @@
 # Media API integrations for real images and audio
+import os
 import requests
-from typing import Optional
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
-# API Configuration - use Streamlit secrets in production, fallback to hardcoded for local dev
+# API Configuration - use Streamlit secrets in production, fallback to env / dev defaults locally
 import streamlit as st
 
-try:
-    # Production: Streamlit Community Cloud
-    UNSPLASH_CLIENT_ID = st.secrets["unsplash"]["access_key"]
-    AUDIO_API_BASE = st.secrets["novakid_tts"]["base_url"]
+@lru_cache(maxsize=1)
+def _media_config() -> Tuple[str, str]:
+    """(Unsplash client ID, TTS base URL), resolved once on first use
+    
+    Streamlit secrets in production, environment variables (or the dev defaults) locally.
+    """
+    try:
+        # Production: Streamlit Community Cloud
+        unsplash_client_id = st.secrets["unsplash"]["access_key"]
+        audio_api_base = st.secrets["novakid_tts"]["base_url"]
+
+        # Check if secrets are just placeholders
+        if audio_api_base == "your_novakid_tts_base_url_here":
+            raise KeyError("Placeholder secrets detected")
+
+    except (KeyError, AttributeError, FileNotFoundError):
+        # Local development: .env / environment, falling back to the current dev values
+        unsplash_client_id = os.getenv('UNSPLASH_ACCESS_KEY', "xwkWSFRdhZdVuEu7VrzlW4Qp3RsMDexu7oMvTFcYitA")
+        audio_api_base = os.getenv('NOVAKID_TTS_BASE_URL', "https://cdn.novakidschool.com/api/0/text_to_speech")
+
+    return unsplash_client_id, audio_api_base
 
-    # Check if secrets are just placeholders
-    if AUDIO_API_BASE == "your_novakid_tts_base_url_here":
-        raise KeyError("Placeholder secrets detected")
+# Keep-alive connections to Unsplash, shared by all sessions and fetch threads
+_HTTP = requests.Session()
+_HTTP.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
 
-except (KeyError, AttributeError):
-    # Local development: fallback to current values
-    UNSPLASH_CLIENT_ID = "xwkWSFRdhZdVuEu7VrzlW4Qp3RsMDexu7oMvTFcYitA"
-    AUDIO_API_BASE = "https://cdn.novakidschool.com/api/0/text_to_speech"
+def _search_unsplash(query: str, client_id: str) -> Optional[str]:
+    """Unsplash search request; raises on failure and makes no Streamlit calls (thread-safe)"""
+    url = f"https://api.unsplash.com/search/photos"
+    params = {
+        "page": 1,
+        "client_id": client_id,
+        "query": query,
+        "per_page": 1
+    }
+    
+    response = _HTTP.get(url, params=params, timeout=5)
+    response.raise_for_status()
+    
+    data = response.json()
+    if data["results"]:
+        return data["results"][0]["urls"]["regular"]
+    return None
 
 @st.cache_data(ttl=3600)
 def get_unsplash_image(query: str) -> Optional[str]:
     """Get image URL from Unsplash API"""
     try:
-        url = f"https://api.unsplash.com/search/photos"
-        params = {
-            "page": 1,
-            "client_id": UNSPLASH_CLIENT_ID,
-            "query": query,
-            "per_page": 1
-        }
-        
-        response = requests.get(url, params=params, timeout=5)
-        response.raise_for_status()
-        
-        data = response.json()
-        if data["results"]:
-            return data["results"][0]["urls"]["regular"]
-        return None
-        
+        return _search_unsplash(query, _media_config()[0])
     except Exception as e:
         st.warning(f"Could not load image: {e}")
         return None
 
+@st.cache_data(ttl=3600)
+def get_unsplash_images(queries: Tuple[str, ...]) -> List[Optional[str]]:
+    """Get image URLs for several queries at once, fetched concurrently
+    
+    Repeated queries (e.g. two options with the same description) are requested once.
+    """
+    unique_queries = list(dict.fromkeys(queries))
+    client_id = _media_config()[0]  # Resolve secrets here, not in the fetch threads
+    with ThreadPoolExecutor(max_workers=max(1, len(unique_queries))) as executor:
+        futures = [executor.submit(_search_unsplash, query, client_id) for query in unique_queries]
+    
+    # Warnings are emitted here, on the script thread
+    url_by_query = {}
+    for query, future in zip(unique_queries, futures):
+        try:
+            url_by_query[query] = future.result()
+        except Exception as e:
+            st.warning(f"Could not load image: {e}")
+            url_by_query[query] = None
+    return [url_by_query[query] for query in queries]
+
 def get_audio_url(text: str, voice: str = "Brian") -> str:
     """Get audio URL from Novakid TTS API"""
-    return f"{AUDIO_API_BASE}?text={requests.utils.quote(text)}&voice={voice}"
\ No newline at end of file
+    return f"{_media_config()[1]}?text={requests.utils.quote(text)}&voice={voice}"
\ No newline at end of file
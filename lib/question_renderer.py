@@ -1,44 +1,53 @@
 # UI components for questions
+import random
+from html import escape
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from typing import Dict, Optional, List
-from .media_apis import get_unsplash_image, get_audio_url
+from .media_apis import get_unsplash_image, get_unsplash_images, get_audio_url
 
 def render_question(question: Dict, question_number: int = None) -> Optional[any]:
-    """Render question based on mechanic type"""
+    """Render question based on mechanic type
+    
+    Must be called inside an st.fragment: in-question interactions rerun
+    only the fragment, not the whole app.
+    """
     
     mechanic = question['mechanic']
     
-    if mechanic == 'multiple-choice-text-text':
-        return render_multiple_choice(question)
-    elif mechanic == 'word-pronunciation-practice':
-        return render_pronunciation(question)
-    elif mechanic == 'image-single-choice-from-texts':
-        return render_image_choice(question)
-    elif mechanic == 'audio-single-choice-from-images':
-        return render_audio_image_choice(question)
-    elif mechanic == 'sentence-pronunciation-practice':
-        return render_sentence_pronunciation(question)
-    elif mechanic == 'sentence-scramble':
-        return render_sentence_scramble(question)
-    elif mechanic == 'audio-category-sorting':
-        return render_audio_category_sorting(question)
-    else:
+    renderer = _RENDERERS.get(mechanic)
+    if renderer is None:
         st.error(f"Unknown mechanic: {mechanic}")
         return None
+    return renderer(question)
+
+def _rerun_question():
+    """Rerun only the question fragment, or the whole app during a full-app run
+
+    Streamlit rejects scope="fragment" unless the fragment itself is what's
+    rerunning, e.g. after a sidebar interaction the fragment runs as part of
+    the full script.
+    """
+    ctx = get_script_run_ctx()
+    if ctx is not None and ctx.fragment_ids_this_run:
+        st.rerun(scope="fragment")
+    st.rerun()
+
+def _pop_result(result_key: str, *cleanup_keys: str) -> any:
+    """Take a question's stored result out of session state, dropping its scratch keys"""
+    for key in cleanup_keys:
+        st.session_state.pop(key, None)
+    return st.session_state.pop(result_key)
 
 def render_multiple_choice(question: Dict) -> Optional[int]:
     """Render multiple choice grammar question"""
     # Check if we have a stored result first (prevents re-rendering)
     result_key = f"mc_result_{question['id']}"
     if result_key in st.session_state:
-        result = st.session_state[result_key]
-        del st.session_state[result_key]
-        return result
-    
-    # Centered big question text
-    st.markdown(f"<h1 style='text-align: center; font-size: 2.5rem;'>{question['sentence']}</h1>", unsafe_allow_html=True)
+        return _pop_result(result_key)
     
-    st.markdown("---")
+    # Centered big question text and divider, one element
+    st.markdown(f"<h1 class='novakid-title'>{question['sentence']}</h1>\n\n---", unsafe_allow_html=True)
     
     # Extra big answer buttons for kids - no help tooltips
     for i, option in enumerate(question['options']):
@@ -49,53 +58,38 @@ def render_multiple_choice(question: Dict) -> Optional[int]:
             type="secondary"
         ):
             st.session_state[result_key] = i
-            st.rerun()
+            _rerun_question()
     
     return None
 
 def render_pronunciation(question: Dict) -> Optional[bool]:
     """Render word pronunciation practice"""
-    recording_key = f'recording_{question["id"]}'
-    result_key = f'speech_result_{question["id"]}'
     final_result_key = f'pronunciation_result_{question["id"]}'
-    media_rendered_key = f'pron_media_rendered_{question["id"]}'
     
     # Return final result if we have one
     if final_result_key in st.session_state:
-        result = st.session_state[final_result_key]
-        del st.session_state[final_result_key]
-        # Clean up rendered flags
-        if media_rendered_key in st.session_state:
-            del st.session_state[media_rendered_key]
-        return result
-    
-    # Always show the word header
-    st.markdown(f"<h1 style='text-align: center; font-size: 3rem; color: #1f77b4;'>{question['target_word']}</h1>", unsafe_allow_html=True)
-    st.markdown(f"<h2 style='text-align: center; font-size: 1.5rem; color: #666;'>/{question['phonetic']}/</h2>", unsafe_allow_html=True)
+        return _pop_result(final_result_key)
     
-    st.markdown("---")
+    # Always show the word header (word, phonetics and divider in one element)
+    st.markdown(
+        f"<h1 class='novakid-target-word'>{question['target_word']}</h1>\n\n"
+        f"<h2 class='novakid-phonetic'>/{question['phonetic']}/</h2>\n\n---",
+        unsafe_allow_html=True
+    )
     
-    # Only render media once per question using session state flag
-    if media_rendered_key not in st.session_state:
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            # Real image from Unsplash
-            image_url = get_unsplash_image(question['image_description'])
-            if image_url:
-                st.image(image_url, width=400, caption=question['image_description'])
-            else:
-                st.info(f"📷 {question['image_description']}")
-            
-            # Real audio from TTS API
-            audio_url = get_audio_url(question['target_word'])
-            st.audio(audio_url)
-        # Mark media as rendered
-        st.session_state[media_rendered_key] = True
-    else:
-        # Show placeholder to maintain layout
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            st.empty()  # Maintain space but don't re-render media
+    # Media is re-emitted on every rerun; the URL lookup is cached, so this makes no request
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        # Real image from Unsplash
+        image_url = get_unsplash_image(question['image_description'])
+        if image_url:
+            st.image(image_url, width=400, caption=question['image_description'])
+        else:
+            st.info(f"📷 {question['image_description']}")
+        
+        # Real audio from TTS API
+        audio_url = get_audio_url(question['target_word'])
+        st.audio(audio_url)
     
     st.markdown("---")
     
@@ -103,46 +97,31 @@ def render_pronunciation(question: Dict) -> Optional[bool]:
     speech_result = render_speech_recognition(question['target_word'], question['id'])
     if speech_result is not None:
         st.session_state[final_result_key] = speech_result
-        st.rerun()
+        _rerun_question()
     
     return None
 
 def render_image_choice(question: Dict) -> Optional[int]:
     """Render image with text choices"""
     result_key = f"img_result_{question['id']}"
-    image_rendered_key = f"img_rendered_{question['id']}"
     
     # Check if we have a stored result
     if result_key in st.session_state:
-        result = st.session_state[result_key]
-        del st.session_state[result_key]
-        # Clean up the rendered flag
-        if image_rendered_key in st.session_state:
-            del st.session_state[image_rendered_key]
-        return result
-    
-    st.markdown("<h1 style='text-align: center; font-size: 2.5rem;'>What do you see?</h1>", unsafe_allow_html=True)
-    
-    # Only render image once per question using session state flag
-    if image_rendered_key not in st.session_state:
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            # Real image from Unsplash
-            image_url = get_unsplash_image(question['image_description'])
-            if image_url:
-                st.image(image_url, width=500)
-            else:
-                st.info(f"📷 {question['image_description']}")
+        return _pop_result(result_key)
+    
+    st.markdown("<h1 class='novakid-title'>What do you see?</h1>", unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        # Real image from Unsplash (cached lookup)
+        image_url = get_unsplash_image(question['image_description'])
+        if image_url:
+            st.image(image_url, width=500)
+        else:
+            st.info(f"📷 {question['image_description']}")
 
-            # Add clear description under the image to help when AI image doesn't match well
-            st.markdown(f"<p style='text-align: center; font-size: 1.1rem; color: #666; margin: 10px 0; font-style: italic;'>{question['image_description']}</p>", unsafe_allow_html=True)
-        # Mark image as rendered
-        st.session_state[image_rendered_key] = True
-    else:
-        # Show placeholder to maintain layout
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            st.empty()  # Maintain space but don't re-render image
+        # Add clear description under the image to help when AI image doesn't match well
+        st.markdown(f"<p class='novakid-caption novakid-caption-lg'>{question['image_description']}</p>", unsafe_allow_html=True)
     
     st.markdown("---")
     
@@ -155,56 +134,42 @@ def render_image_choice(question: Dict) -> Optional[int]:
             type="secondary"
         ):
             st.session_state[result_key] = i
-            st.rerun()
+            _rerun_question()
     
     return None
 
 def render_audio_image_choice(question: Dict) -> Optional[int]:
     """Render audio with image choices"""
     result_key = f"audio_img_result_{question['id']}"
-    media_rendered_key = f"audio_img_media_rendered_{question['id']}"
     
     # Check if we have a stored result
     if result_key in st.session_state:
-        result = st.session_state[result_key]
-        del st.session_state[result_key]
-        # Clean up the rendered flag
-        if media_rendered_key in st.session_state:
-            del st.session_state[media_rendered_key]
-        return result
-    
-    st.markdown("<h1 style='text-align: center; font-size: 2.5rem;'>🎧 Listen and Choose</h1>", unsafe_allow_html=True)
-    
-    # Only render audio once per question using session state flag
-    if media_rendered_key not in st.session_state:
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            # Real audio from TTS API
-            audio_url = get_audio_url(question['target_audio'])
-            st.audio(audio_url)
-        # Mark media as rendered
-        st.session_state[media_rendered_key] = True
-    else:
-        # Show placeholder to maintain layout
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            st.empty()  # Maintain space but don't re-render audio
+        return _pop_result(result_key)
+    
+    st.markdown("<h1 class='novakid-title'>🎧 Listen and Choose</h1>", unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        # Real audio from TTS API
+        audio_url = get_audio_url(question['target_audio'])
+        st.audio(audio_url)
     
     st.markdown("---")
     
-    # Image options in a row
+    # Image options in a row; all images are fetched in parallel
+    image_urls = get_unsplash_images(tuple(question['image_options']))
     cols = st.columns(len(question['image_options']))
     for i, image_desc in enumerate(question['image_options']):
         with cols[i]:
             # Real image from Unsplash
-            image_url = get_unsplash_image(image_desc)
+            image_url = image_urls[i]
             if image_url:
                 st.image(image_url, width=200)
             else:
                 st.info(f"📷 {image_desc}")
 
             # Add clear description under each image option to help when AI images don't match well
-            st.markdown(f"<p style='text-align: center; font-size: 0.9rem; color: #666; margin: 5px 0; font-style: italic;'>{image_desc}</p>", unsafe_allow_html=True)
+            st.markdown(f"<p class='novakid-caption'>{image_desc}</p>", unsafe_allow_html=True)
 
             if st.button(
                 f"Choose {chr(65+i)}",
@@ -213,53 +178,38 @@ def render_audio_image_choice(question: Dict) -> Optional[int]:
                 type="secondary"
             ):
                 st.session_state[result_key] = i
-                st.rerun()
+                _rerun_question()
     
     return None
 
 def render_sentence_pronunciation(question: Dict) -> Optional[bool]:
     """Render sentence pronunciation practice"""
-    recording_key = f'sentence_recording_{question["id"]}'
-    result_key = f'sentence_speech_result_{question["id"]}'
     final_result_key = f'sentence_pronunciation_result_{question["id"]}'
-    media_rendered_key = f'sentence_pron_media_rendered_{question["id"]}'
     
     # Return final result if we have one
     if final_result_key in st.session_state:
-        result = st.session_state[final_result_key]
-        del st.session_state[final_result_key]
-        # Clean up rendered flags
-        if media_rendered_key in st.session_state:
-            del st.session_state[media_rendered_key]
-        return result
+        return _pop_result(final_result_key)
     
-    # Always show the sentence header
-    st.markdown(f"<h1 style='text-align: center; font-size: 2.5rem; color: #1f77b4;'>{question['target_sentence']}</h1>", unsafe_allow_html=True)
-    st.markdown(f"<h2 style='text-align: center; font-size: 1.5rem; color: #666;'>/{question['phonetic']}/</h2>", unsafe_allow_html=True)
+    # Always show the sentence header (sentence, phonetics and divider in one element)
+    st.markdown(
+        f"<h1 class='novakid-target-sentence'>{question['target_sentence']}</h1>\n\n"
+        f"<h2 class='novakid-phonetic'>/{question['phonetic']}/</h2>\n\n---",
+        unsafe_allow_html=True
+    )
     
-    st.markdown("---")
-    
-    # Only render media once per question using session state flag
-    if media_rendered_key not in st.session_state:
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            # Real image from Unsplash
-            image_url = get_unsplash_image(question['image_description'])
-            if image_url:
-                st.image(image_url, width=400, caption=question['image_description'])
-            else:
-                st.info(f"📷 {question['image_description']}")
-            
-            # Real audio from TTS API
-            audio_url = get_audio_url(question['target_sentence'])
-            st.audio(audio_url)
-        # Mark media as rendered
-        st.session_state[media_rendered_key] = True
-    else:
-        # Show placeholder to maintain layout
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            st.empty()  # Maintain space but don't re-render media
+    # Media is re-emitted on every rerun; the URL lookup is cached, so this makes no request
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        # Real image from Unsplash
+        image_url = get_unsplash_image(question['image_description'])
+        if image_url:
+            st.image(image_url, width=400, caption=question['image_description'])
+        else:
+            st.info(f"📷 {question['image_description']}")
+        
+        # Real audio from TTS API
+        audio_url = get_audio_url(question['target_sentence'])
+        st.audio(audio_url)
     
     st.markdown("---")
     
@@ -267,7 +217,7 @@ def render_sentence_pronunciation(question: Dict) -> Optional[bool]:
     speech_result = render_speech_recognition(question['target_sentence'], question['id'], is_sentence=True)
     if speech_result is not None:
         st.session_state[final_result_key] = speech_result
-        st.rerun()
+        _rerun_question()
     
     return None
 
@@ -278,43 +228,35 @@ def render_sentence_scramble(question: Dict) -> Optional[List[int]]:
     
     # Check if we have a stored result
     if result_key in st.session_state:
-        result = st.session_state[result_key]
-        del st.session_state[result_key]
-        # Clean up selected words
-        if selected_words_key in st.session_state:
-            del st.session_state[selected_words_key]
-        return result
+        return _pop_result(result_key, selected_words_key)
     
     # Initialize selected words if not present
     if selected_words_key not in st.session_state:
         st.session_state[selected_words_key] = []
     
-    st.markdown("<h1 style='text-align: center; font-size: 2.5rem;'>🧩 Put the words in order</h1>", unsafe_allow_html=True)
+    st.markdown("<h1 class='novakid-title'>🧩 Put the words in order</h1>", unsafe_allow_html=True)
     
-    # Show sentence template with blanks
+    # Show sentence template with blanks, filled in the order words were chosen
     sentence_parts = question['sentence_template'].split('___')
-    display_sentence = ""
     selected_words = st.session_state[selected_words_key]
-    blank_index = 0
-    
-    for i, part in enumerate(sentence_parts):
-        display_sentence += part
-        if i < len(sentence_parts) - 1:  # Not the last part
-            if blank_index < len(selected_words):
-                display_sentence += f"<span style='background: #e3f2fd; padding: 5px 10px; border-radius: 5px; margin: 0 5px; font-weight: bold;'>{question['word_options'][selected_words[blank_index]]}</span>"
-            else:
-                display_sentence += "<span style='background: #f5f5f5; padding: 5px 10px; border-radius: 5px; margin: 0 5px; border: 2px dashed #ccc;'>___</span>"
-            blank_index += 1
-    
-    st.markdown(f"<h2 style='text-align: center; font-size: 1.8rem; margin: 30px 0;'>{display_sentence}</h2>", unsafe_allow_html=True)
+    html_parts = [sentence_parts[0]]
     
-    st.markdown("---")
+    for blank_index, part in enumerate(sentence_parts[1:]):
+        if blank_index < len(selected_words):
+            html_parts.append(f"<span class='novakid-chip novakid-chip-filled'>{question['word_options'][selected_words[blank_index]]}</span>")
+        else:
+            html_parts.append("<span class='novakid-chip novakid-chip-blank'>___</span>")
+        html_parts.append(part)
+    display_sentence = "".join(html_parts)
     
-    # Word options buttons
-    st.markdown("### Choose words in order:")
+    # Sentence, divider and the word options heading in one element
+    st.markdown(
+        f"<h2 class='novakid-scramble-sentence'>{display_sentence}</h2>\n\n---\n\n### Choose words in order:",
+        unsafe_allow_html=True
+    )
     
     # Calculate how many blanks we need to fill
-    num_blanks = question['sentence_template'].count('___')
+    num_blanks = len(sentence_parts) - 1
     
     # Show available words
     cols = st.columns(min(len(question['word_options']), 4))  # Max 4 columns
@@ -334,7 +276,7 @@ def render_sentence_scramble(question: Dict) -> Optional[List[int]]:
             ):
                 if len(selected_words) < num_blanks:
                     st.session_state[selected_words_key].append(i)
-                    st.rerun()
+                    _rerun_question()
     
     # Control buttons
     col1, col2, col3 = st.columns([1, 1, 1])
@@ -342,13 +284,13 @@ def render_sentence_scramble(question: Dict) -> Optional[List[int]]:
     with col1:
         if st.button("🔄 Clear All", key=f"clear_{question['id']}", use_container_width=True):
             st.session_state[selected_words_key] = []
-            st.rerun()
+            _rerun_question()
     
     with col2:
         if st.button("⬅️ Remove Last", key=f"remove_last_{question['id']}", use_container_width=True):
             if selected_words:
                 st.session_state[selected_words_key].pop()
-                st.rerun()
+                _rerun_question()
     
     with col3:
         # Submit button - only enabled when all blanks are filled
@@ -361,7 +303,7 @@ def render_sentence_scramble(question: Dict) -> Optional[List[int]]:
             disabled=submit_disabled
         ):
             st.session_state[result_key] = selected_words.copy()
-            st.rerun()
+            _rerun_question()
     
     return None
 
@@ -375,144 +317,123 @@ def render_speech_recognition(target_word: str, question_id: str, is_sentence: b
     col1, col2, col3 = st.columns([1, 2, 1])
     
     with col2:
-        # Check if we're in recording state
-        recording_key = f'recording_{question_id}'
         result_key = f'speech_result_{question_id}'
         
-        if recording_key in st.session_state:
+        if result_key in st.session_state:
             # Show recording state
             st.markdown("### 🔴 Recording...")
             st.info("Speak clearly now!")
             
-            # Auto progress bar to simulate recording
-            import time
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            for i in range(100):
-                progress_bar.progress(i + 1)
-                status_text.text(f'Listening... {i+1}%')
-                time.sleep(0.03)  # 3 seconds total
-            
-            # Random result for demo
-            import random
-            success = random.choice([True, True, True, False])  # 75% success rate for demo
+            # Progress bar animated in the browser (see assets/custom.css), one element instead of 100 updates
+            st.markdown(
+                "<div class='novakid-listening-track'><div class='novakid-listening-bar'></div></div>"
+                "<p>Listening...</p>",
+                unsafe_allow_html=True
+            )
             
-            # Store result and clean up recording state
-            st.session_state[result_key] = success
-            del st.session_state[recording_key]
-            
-            # Show result
-            if success:
-                st.success("✅ Great pronunciation! Well done!")
-            else:
-                st.error("😊 Good try! Keep practicing!")
-            
-            time.sleep(1.5)  # Brief pause to show result
-            st.rerun()
-        
-        elif result_key in st.session_state:
-            # Return the stored result and clean up
-            result = st.session_state[result_key]
-            del st.session_state[result_key]
-            return result
+            # The verdict appears once the bar fills (CSS delay); the student moves on with a tap
+            with st.container(key=f"novakid-reveal-{question_id}"):
+                if st.session_state[result_key]:
+                    st.success("✅ Great pronunciation! Well done!")
+                else:
+                    st.error("😊 Good try! Keep practicing!")
+                
+                if st.button("Continue ➡️", key=f"speech_continue_{question_id}", use_container_width=True, type="primary"):
+                    # Return the stored result and clean up
+                    return st.session_state.pop(result_key)
         
         else:
             # Show initial record button
             if st.button("🎤 Record Your Voice", key=f"speech_btn_{question_id}", use_container_width=True, type="primary"):
-                st.session_state[recording_key] = True
-                st.rerun()
+                # Random result for demo, decided straight away: the browser paces the reveal
+                st.session_state[result_key] = random.random() < 0.75  # 75% success rate for demo
+                _rerun_question()
     
     return None
 
+# Static top of the category sorting question, sent as one markdown element
+_CATEGORY_SORTING_HEADER = (
+    "<h1 class='novakid-title'>🎧 Sort the Words!</h1>\n\n"
+    "<p class='novakid-subtitle'>Listen to each word and click the correct category</p>\n\n"
+    "---\n\n"
+    "### Categories:"
+)
+
 def render_audio_category_sorting(question: Dict) -> Optional[Dict]:
     """Render audio category sorting mechanic"""
     result_key = f"category_sort_result_{question['id']}"
-    media_rendered_key = f"category_sort_media_rendered_{question['id']}"
     answers_key = f"category_sort_answers_{question['id']}"
     
     # Check if we have a stored result
     if result_key in st.session_state:
-        result = st.session_state[result_key]
-        del st.session_state[result_key]
-        # Clean up flags and answers
-        if media_rendered_key in st.session_state:
-            del st.session_state[media_rendered_key]
-        if answers_key in st.session_state:
-            del st.session_state[answers_key]
-        return result
+        return _pop_result(result_key, answers_key)
     
     # Initialize answers dict if not present
     if answers_key not in st.session_state:
         st.session_state[answers_key] = {}
     
-    st.markdown("<h1 style='text-align: center; font-size: 2.5rem;'>🎧 Sort the Words!</h1>", unsafe_allow_html=True)
-    st.markdown("<p style='text-align: center; font-size: 1.2rem;'>Listen to each word and click the correct category</p>", unsafe_allow_html=True)
-    
-    st.markdown("---")
-    
-    # Show categories as cards/buttons
-    st.markdown("### Categories:")
+    # Static header, divider and the categories heading in one element
+    st.markdown(_CATEGORY_SORTING_HEADER, unsafe_allow_html=True)
     category_cols = st.columns(len(question['categories']))
+    category_image_urls = get_unsplash_images(tuple(c['image_description'] for c in question['categories']))
     
     for i, category in enumerate(question['categories']):
         with category_cols[i]:
             # Category card with image
-            st.markdown(f"<div style='text-align: center; background: #f0f8ff; padding: 20px; border-radius: 15px; margin: 10px; border: 3px solid #1f77b4;'>"
-                       f"<h3 style='color: #1f77b4; margin: 0;'>{category['name']}</h3>"
-                       f"</div>", unsafe_allow_html=True)
+            st.markdown("<div class='novakid-category-card'>"
+                       f"<h3>{category['name']}</h3>"
+                       "</div>", unsafe_allow_html=True)
             
             # Real image from Unsplash for category
-            image_url = get_unsplash_image(category['image_description'])
+            image_url = category_image_urls[i]
             if image_url:
                 st.image(image_url, width=200)
             else:
                 st.info(f"📷 {category['image_description']}")
 
             # Add clear description under the category image to help when AI image doesn't match well
-            st.markdown(f"<p style='text-align: center; font-size: 0.9rem; color: #666; margin: 5px 0; font-style: italic;'>{category['image_description']}</p>", unsafe_allow_html=True)
-    
-    st.markdown("---")
+            st.markdown(f"<p class='novakid-caption'>{category['image_description']}</p>", unsafe_allow_html=True)
     
     # Show audio items to sort
-    st.markdown("### Listen and Sort:")
+    st.markdown("---\n\n### Listen and Sort:")
     
     answers = st.session_state[answers_key]
+    categories = question['categories']
     all_answered = True
     
     for i, audio_item in enumerate(question['audio_items']):
         word = audio_item['word']
         
-        col1, col2, col3 = st.columns([2, 1, 2])
+        # Two columns per word, no arrow column or divider: fewer elements per rerun
+        col1, col2 = st.columns([2, 3], vertical_alignment="center")
         
         with col1:
-            # Audio player with word
+            # Plain audio player and label in one element; preload="none" leaves
+            # TTS synthesis until the student presses play
             audio_url = get_audio_url(word)
-            st.audio(audio_url)
-            st.markdown(f"<p style='text-align: center; font-size: 1.5rem;'>Word #{i+1}</p>", unsafe_allow_html=True)
+            st.markdown(
+                f"<div class='novakid-word-audio'><audio controls preload='none' src='{escape(audio_url)}'></audio></div>"
+                f"<p class='novakid-word-number'>Word #{i+1}</p>",
+                unsafe_allow_html=True
+            )
         
         with col2:
-            st.markdown("→")
-        
-        with col3:
-            # Category selection buttons
-            if word not in answers:
+            # One segmented control per word (a single widget, not a button per category);
+            # changing it reruns the fragment on its own
+            choice = st.segmented_control(
+                f"Category for word #{i+1}",
+                options=list(range(len(categories))),
+                format_func=lambda cat_idx: f"🏷️ {categories[cat_idx]['name']}",
+                key=f"sort_choice_{question['id']}_{i}",
+                label_visibility="collapsed"
+            )
+            if choice is None:
+                answers.pop(word, None)
                 all_answered = False
-                
-            for cat_idx, category in enumerate(question['categories']):
-                selected = answers.get(word) == cat_idx
-                button_type = "primary" if selected else "secondary"
-                
-                if st.button(
-                    f"🏷️ {category['name']}", 
-                    key=f"sort_btn_{question['id']}_{i}_{cat_idx}",
-                    type=button_type,
-                    use_container_width=True
-                ):
-                    st.session_state[answers_key][word] = cat_idx
-                    st.rerun()
-        
-        st.markdown("---")
+            else:
+                answers[word] = choice
+    
+    st.markdown("---")
     
     # Submit button
     if all_answered:
@@ -520,41 +441,57 @@ def render_audio_category_sorting(question: Dict) -> Optional[Dict]:
         with col2:
             if st.button("✅ Submit All", key=f"submit_sort_{question['id']}", type="primary", use_container_width=True):
                 st.session_state[result_key] = answers.copy()
-                st.rerun()
+                _rerun_question()
     else:
         st.info("🎯 Please sort all words before submitting!")
     
     return None
 
-def check_answer(question: Dict, answer: any) -> bool:
-    """Check if answer is correct"""
-    mechanic = question['mechanic']
+def _check_choice(question: Dict, answer: any) -> bool:
+    return answer == question['correct_answer']
+
+def _check_pronunciation(question: Dict, answer: any) -> bool:
+    # For pronunciation, we're using self-assessment
+    return answer  # True if they said they did well or OK
+
+def _check_scramble(question: Dict, answer: any) -> bool:
+    # Check if the selected word order matches the correct order
+    return answer == question['correct_order']
+
+def _check_category_sorting(question: Dict, answer: any) -> bool:
+    # Check if all audio items are sorted correctly
+    if not isinstance(answer, dict):
+        return False
     
-    if mechanic in ['multiple-choice-text-text', 'image-single-choice-from-texts', 'audio-single-choice-from-images']:
-        return answer == question['correct_answer']
-    elif mechanic in ['word-pronunciation-practice', 'sentence-pronunciation-practice']:
-        # For pronunciation, we're using self-assessment
-        return answer  # True if they said they did well or OK
-    elif mechanic == 'sentence-scramble':
-        # Check if the selected word order matches the correct order
-        return answer == question['correct_order']
-    elif mechanic == 'audio-category-sorting':
-        # Check if all audio items are sorted correctly
-        if not isinstance(answer, dict):
-            return False
-        
-        correct_count = 0
-        total_items = len(question['audio_items'])
-        
-        for audio_item in question['audio_items']:
-            word = audio_item['word']
-            correct_category = audio_item['category_index']
-            user_category = answer.get(word, -1)
-            
-            if user_category == correct_category:
-                correct_count += 1
-        
-        # Consider it correct if they get majority right (to be kid-friendly)
-        return correct_count >= (total_items * 0.6)
+    audio_items = question['audio_items']
+    correct_count = sum(answer.get(item['word'], -1) == item['category_index'] for item in audio_items)
     
-    return False
\ No newline at end of file
+    # Consider it correct if they get majority right (to be kid-friendly)
+    return correct_count >= (len(audio_items) * 0.6)
+
+# Renderer per mechanic, used by render_question
+_RENDERERS = {
+    'multiple-choice-text-text': render_multiple_choice,
+    'word-pronunciation-practice': render_pronunciation,
+    'image-single-choice-from-texts': render_image_choice,
+    'audio-single-choice-from-images': render_audio_image_choice,
+    'sentence-pronunciation-practice': render_sentence_pronunciation,
+    'sentence-scramble': render_sentence_scramble,
+    'audio-category-sorting': render_audio_category_sorting
+}
+
+# Answer checker per mechanic; unknown mechanics are never correct
+_ANSWER_CHECKERS = {
+    'multiple-choice-text-text': _check_choice,
+    'image-single-choice-from-texts': _check_choice,
+    'audio-single-choice-from-images': _check_choice,
+    'word-pronunciation-practice': _check_pronunciation,
+    'sentence-pronunciation-practice': _check_pronunciation,
+    'sentence-scramble': _check_scramble,
+    'audio-category-sorting': _check_category_sorting
+}
+
+def check_answer(question: Dict, answer: any) -> bool:
+    """Check if answer is correct"""
+    checker = _ANSWER_CHECKERS.get(question['mechanic'])
+    return checker(question, answer) if checker else False